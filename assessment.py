@@ -0,0 +1,347 @@
+# assessment.py
+# ================================
+# ASSESSMENT CORE (NO UI)
+# ================================
+# Question generation, report generation, report indexing and the RAG
+# chatbot. app.py wires these into the Streamlit UI. Batch jobs and
+# benchmarks import them directly, so nothing in this module may touch
+# st.session_state; callers pass the user ID explicitly.
+import os
+import time
+import numpy as np
+import metrics
+from chat_memory import ChatMemory, build_rag_prompt, conversation_fingerprint
+from llm_gateway import get_gateway
+from model_registry import EMBED_DIMENSION, embed_stats, get_embed_model, model_stats
+from question_parser import QuestionSetError, QuestionSetParser, repair_prompt
+from report_cache import get_report_cache
+from report_chunker import chunk_report
+from semantic_cache import answer_cache, chunks_fingerprint
+from submit_pipeline import submit
+from vector_store import KIND_REPORT, get_store
+
+# ================================
+# CONFIGURE LLM (GROQ API)
+# ================================
+# The Groq backend reads GROQ_API_KEY from the environment. All calls go
+# through the shared gateway (pooling, rate limiting, retries); set
+# LLM_BACKEND=local to run without network access
+llm = get_gateway()
+LLM_MODEL = "llama-3.3-70b-versatile"
+
+def _llm_messages(prompt):
+    return [
+        {"role": "system", "content": "You generate structured JSON personality questions only."},
+        {"role": "user", "content": prompt}
+    ]
+
+def call_llm(prompt):
+    with metrics.span("call_llm"):
+        return llm.complete(LLM_MODEL, _llm_messages(prompt), temperature=0.3)
+
+def call_llm_stream(prompt):
+    """Like call_llm, but yields the completion text as tokens arrive."""
+    with metrics.span("call_llm_stream"):
+        start = time.perf_counter()
+        first = True
+        for token in llm.stream(LLM_MODEL, _llm_messages(prompt), temperature=0.3):
+            if first:
+                metrics.observe("llm_first_token_seconds", time.perf_counter() - start)
+                first = False
+            yield token
+
+# ================================
+# GENERATE TEST QUESTIONS (JSON)
+# ================================
+QUESTION_REPAIR_ATTEMPTS = int(os.environ.get("QUESTION_REPAIR_ATTEMPTS", "2"))
+
+def request_question_set(on_question=None):
+    """Ask the LLM for one raw question set.
+
+    The reply is parsed and validated while it streams; `on_question(index,
+    text)` fires for each valid question as it arrives. Missing or broken
+    items are re-requested on their own (up to QUESTION_REPAIR_ATTEMPTS
+    times). Raises QuestionSetError, carrying the salvaged part, if the set
+    is still incomplete.
+    """
+    prompt = """
+    Acting as an expert psychologist. You are creating a personality assessment based on the Big Five traits:
+
+- Openness
+- Conscientiousness
+- Extraversion
+- Agreeableness
+- Neuroticism
+
+REQUIREMENTS:
+- Generate EXACTLY 15 questions personality assessment based on the TIPI Big Five model.
+- Each question must be a natural full sentence.
+- Questions may implicitly measure one or multiple traits, but DO NOT mention the traits in the output.
+- Questions should feel conversational, real, and not scientific.
+- Output JSON ONLY as:
+JSON FORMAT:
+{
+  "questions": [
+     "Question 1",
+     ...
+     "Question 15"
+  ],
+  "trait_mapping": [
+     {"index": 0, "traits": ["Extraversion"]},
+     ...
+  ]
+}
+
+Allowed trait names:
+Extraversion, Agreeableness, Conscientiousness, Neuroticism, Openness
+
+No extra text, no comments, no formatting outside JSON.
+    No explanations. No markdown.
+    """
+
+    parser = QuestionSetParser(on_question)
+    for token in call_llm_stream(prompt):
+        parser.feed(token)
+
+    for _ in range(QUESTION_REPAIR_ATTEMPTS):
+        if parser.complete():
+            break
+        print("Repairing question set; missing questions", parser.missing_questions(),
+              "unmapped", parser.unmapped(), "rejected", parser.rejected)
+        metrics.inc("question_set_repairs_total")
+        repair = QuestionSetParser(slots=parser.missing_questions())
+        for token in call_llm_stream(repair_prompt(parser)):
+            repair.feed(token)
+        parser.merge(repair)
+
+    if not parser.complete():
+        raise QuestionSetError(
+            f"incomplete question set: missing {parser.missing_questions()}, unmapped {parser.unmapped()}",
+            parser.salvage()
+        )
+    return parser.result()
+
+def build_question_items(data):
+    """Turn a raw `questions`/`trait_mapping` dict into the UI question list."""
+    final = []
+    for i, qtext in enumerate(data["questions"]):
+        # default trait extraction from trait_mapping
+        trait = "Openness"
+        for tm in data.get("trait_mapping", []):
+            if tm.get("index") == i and tm.get("traits"):
+                trait = tm["traits"][0]
+                break
+
+        final.append({
+            "question": qtext,
+            "options": [
+                "Strongly Disagree",
+                "Disagree",
+                "Neutral",
+                "Agree",
+                "Strongly Agree"
+            ],
+            "trait": trait
+        })
+
+    return final
+
+def generate_personality_questions(on_question=None):
+    try:
+        data = request_question_set(on_question)
+        return build_question_items(data)
+
+    except QuestionSetError as e:
+        print("Question set incomplete:", e)
+        # Better a shorter test than none; unmapped questions default to Openness
+        if e.partial["questions"]:
+            return build_question_items(e.partial)
+        return [{"error": "INVALID JSON RETURNED"}]
+
+    except Exception as e:
+        print("Question generation error:", e)
+        return [{"error": "INVALID JSON RETURNED"}]
+
+# ================================
+# GENERATE LLM PERSONALITY REPORT
+# ================================
+def report_prompt(trait_scores):
+    return f"""
+You are a personality psychology expert.
+
+Based on these Big Five scores:
+{trait_scores}
+
+Write a **personalized report in second person**.
+1. A 3-4 sentence personality summary.
+2. 4 strengths (bullet list)
+3. 4 growth areas (bullet list)
+4. 4 actionable recommendations
+
+Use friendly, conversational language.
+No headings, just formatted text.
+"""
+
+# Reports are generated from quantized scores and cached on disk per
+# bucket, so similar profiles skip the LLM call (see report_cache.py)
+report_cache = get_report_cache()
+
+def generate_report(trait_scores):
+    cached = report_cache.get(trait_scores)
+    if cached is not None:
+        return cached
+    report = call_llm(report_prompt(report_cache.bucket(trait_scores)))
+    report_cache.put(trait_scores, report)
+    return report
+
+def generate_report_stream(trait_scores):
+    cached = report_cache.get(trait_scores)
+    if cached is not None:
+        # line by line, so streaming consumers (chunk embedder) see the usual shape
+        yield from cached.splitlines(keepends=True)
+        return
+    parts = []
+    for token in call_llm_stream(report_prompt(report_cache.bucket(trait_scores))):
+        parts.append(token)
+        yield token
+    report_cache.put(trait_scores, "".join(parts).strip())
+
+# ================================
+# SETUP FAISS VECTOR STORE
+# ================================
+# The model is loaded once per process (see model_registry.py), not per rerun
+dimension = EMBED_DIMENSION
+vector_store = get_store(EMBED_DIMENSION)
+
+# Sizes and counters that already live on these objects are read at export
+# time only (see metrics.py)
+metrics.register_collector("vector_store", vector_store.stats)
+metrics.register_collector("semantic_cache", answer_cache.stats)
+metrics.register_collector("llm_gateway", lambda: llm.stats)
+metrics.register_collector("report_cache", report_cache.stats)
+metrics.register_collector("embed_batcher", embed_stats)
+metrics.register_collector("model", model_stats)
+
+def encode_texts(texts):
+    with metrics.span("embed_encode"):
+        metrics.inc("embed_texts_total", len(texts))
+        return get_embed_model().encode(texts)
+
+def store_in_faiss(text, user_id, meta=None, embedder=None):
+    """Index a report as section-tagged chunks plus one full-report record.
+
+    `embedder` (a ChunkEmbedder) supplies vectors that were already computed
+    while the report was streaming; otherwise all chunks are encoded here in
+    one batched call.
+    """
+    chunks = chunk_report(text) or [{"text": text, "section": "summary", "position": 0}]
+    if embedder is not None:
+        vecs = np.array(embedder.finish(chunks)).astype('float32')
+    else:
+        vecs = np.array(encode_texts([c["text"] for c in chunks])).astype('float32')
+
+    chunk_ids = vector_store.add(
+        user_id,
+        [c["text"] for c in chunks],
+        vecs,
+        [{"section": c["section"], "position": c["position"]} for c in chunks]
+    )
+    report_meta = dict(meta or {}, chunk_ids=chunk_ids)
+    vector_store.add(user_id, [text], vecs.mean(axis=0, keepdims=True), [report_meta], kind=KIND_REPORT)
+
+# ================================
+# RAG CHATBOT
+# ================================
+NO_PROFILE_MESSAGE = "No personality profile found yet. Take the test first."
+RAG_TOP_K = int(os.environ.get("RAG_TOP_K", "4"))
+
+def retrieve_chunks(user_query, user_id, k=RAG_TOP_K, query_vec=None):
+    """Top-k chunks of the user's latest report, or None if there is none."""
+    latest = vector_store.latest(user_id)
+    if latest is None:
+        return None
+
+    # Encode user query
+    if query_vec is None:
+        query_vec = encode_texts([user_query])
+    hits = vector_store.search(
+        user_id, np.array(query_vec).astype('float32'), k,
+        ids=latest[1]["meta"].get("chunk_ids")
+    )
+    chunks = []
+    for doc_id, distance in hits:
+        doc = vector_store.get(doc_id)
+        chunks.append(dict(doc["meta"], text=doc["text"], id=doc_id, distance=distance))
+    return chunks
+
+def rag_context(user_query, user_id, memory=None):
+    """(prompt, cache key) for a chat turn, or None if no profile is stored yet.
+
+    The prompt packs the best chunks, and for follow-up questions the chat
+    memory (a ChatMemory, see chat_memory.py), into RAG_PROMPT_BUDGET tokens.
+    The cache key is the query embedding plus a fingerprint of the chunks
+    used and of any conversation packed with them; see semantic_cache.py.
+    """
+    query_vec = np.array(encode_texts([user_query])).astype('float32')
+    chunks = retrieve_chunks(user_query, user_id, query_vec=query_vec)
+    if chunks is None:
+        return None
+
+    # Best passages first, grouped by report section in the prompt
+    chunks.sort(key=lambda c: c["distance"])
+    prompt, used, conversation, _ = build_rag_prompt(user_query, chunks, memory)
+    fingerprint = chunks_fingerprint(used)
+    if conversation:
+        # the answer depends on this exact conversation
+        fingerprint += ":" + conversation_fingerprint(conversation)
+    return prompt, (query_vec[0], fingerprint)
+
+def rag_chat(user_query, user_id, memory=None):
+    """Answer user queries based on stored personality report using LLM.
+
+    With a `memory`, follow-ups see the conversation so far and the
+    exchange is recorded in it.
+    """
+    context = rag_context(user_query, user_id, memory)
+    if context is None:
+        return NO_PROFILE_MESSAGE
+    prompt, (query_vec, fingerprint) = context
+
+    answer = answer_cache.get(query_vec, fingerprint)
+    if answer is None:
+        answer = call_llm(prompt)
+        answer_cache.put(query_vec, fingerprint, answer)
+    if memory is not None:
+        memory.add(user_query, answer)
+    return answer
+
+def rag_chat_stream(user_query, user_id, memory=None):
+    """Streaming rag_chat: yields the answer token by token."""
+    context = rag_context(user_query, user_id, memory)
+    if context is None:
+        yield NO_PROFILE_MESSAGE
+        return
+    prompt, (query_vec, fingerprint) = context
+
+    answer = answer_cache.get(query_vec, fingerprint)
+    if answer is not None:
+        yield answer
+    else:
+        parts = []
+        for token in call_llm_stream(prompt):
+            parts.append(token)
+            yield token
+        answer = "".join(parts).strip()
+        answer_cache.put(query_vec, fingerprint, answer)
+    if memory is not None:
+        memory.add(user_query, answer)
+
+def new_chat_memory(state=None, messages=()):
+    """ChatMemory summarizing with call_llm in the background.
+
+    `state` is a saved ChatMemory.state(); without it the memory is seeded
+    from `messages`, the recent turns of an existing chat.
+    """
+    if state is None:
+        return ChatMemory.from_history(call_llm, submit, messages)
+    return ChatMemory(call_llm, submit, state)
@@ -0,0 +1,171 @@
+# batch_assess.py
+# ================================
+# HEADLESS BATCH ASSESSMENT
+# ================================
+# Runs answers collected elsewhere through the same pipeline as the app,
+# with no UI. Each respondent is scored, gets a generated report, and has
+# that report indexed for the chatbot under their ID.
+#
+#   python batch_assess.py answers.csv --mapping mapping.json --id-column id --output results.jsonl
+#
+# Scoring is vectorized per input chunk, so per-row overhead is negligible.
+# Reports run on a bounded worker pool sized to the LLM gateway's
+# concurrency. Reading the input pauses while WORKERS * 2 respondents are
+# in flight (backpressure).
+#
+# Results are appended to the output JSONL as each respondent finishes,
+# and that file is also the checkpoint: rerunning the same command skips
+# IDs already written. Failures go to <output>.errors.jsonl, once per ID,
+# and are retried on the next run.
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from assessment import generate_report, store_in_faiss
+from llm_gateway import LLM_MAX_CONCURRENCY
+from scoring import answers_to_matrix, iter_input, load_mapping, score_matrix, scores_to_dicts
+
+
+def completed_ids(path):
+    """IDs already present in an output file (the resume checkpoint)."""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                done.add(json.loads(line)["id"])
+            except (ValueError, KeyError):
+                # a torn last line from a killed run; that respondent is redone
+                continue
+    return done
+
+
+class _JsonlWriter:
+    """Thread-safe line appender, flushed per record so a crash loses nothing."""
+
+    def __init__(self, path):
+        self._f = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def write(self, record):
+        line = json.dumps(record) + "\n"
+        with self._lock:
+            self._f.write(line)
+            self._f.flush()
+
+    def close(self):
+        self._f.close()
+
+
+def assess(respondent_id, scores, index=True):
+    """Report (and optionally index) one scored respondent; returns the result record."""
+    report = generate_report(scores)
+    if index:
+        store_in_faiss(report, respondent_id, {"scores": scores})
+    return {"id": respondent_id, "scores": scores, "report": report}
+
+
+def run_batch(input_path, output_path, mapping, id_column, workers=LLM_MAX_CONCURRENCY,
+              chunk_size=1000, index=True, limit=None):
+    """Assess every respondent not yet in output_path; returns (done, failed, skipped)."""
+    question_columns = list(mapping)
+    question_traits = [mapping[c] for c in question_columns]
+    traits = list(dict.fromkeys(question_traits))
+    done_ids = completed_ids(output_path)
+
+    errors_path = output_path + ".errors.jsonl"
+    # failures from earlier runs are retried, but not logged a second time
+    logged_errors = completed_ids(errors_path)
+    results = _JsonlWriter(output_path)
+    errors = _JsonlWriter(errors_path)
+    inflight = threading.BoundedSemaphore(workers * 2)
+    counts = {"done": 0, "failed": 0, "skipped": 0}
+    counts_lock = threading.Lock()
+    start = time.perf_counter()
+
+    def fail(respondent_id, error):
+        """Count a failure and log it unless this ID is already in the errors file."""
+        with counts_lock:
+            counts["failed"] += 1
+            new = respondent_id not in logged_errors
+            logged_errors.add(respondent_id)
+        if new:
+            errors.write({"id": respondent_id, "error": error, "ts": time.time()})
+
+    def task(respondent_id, scores):
+        try:
+            results.write(assess(respondent_id, scores, index))
+            with counts_lock:
+                counts["done"] += 1
+        except Exception as e:
+            fail(respondent_id, f"{type(e).__name__}: {e}")
+        finally:
+            inflight.release()
+        with counts_lock:
+            finished = counts["done"] + counts["failed"]
+        if finished % 100 == 0:
+            rate = finished / (time.perf_counter() - start)
+            print(f"[batch] {finished} assessed ({counts['failed']} failed), {rate:.2f}/s")
+
+    submitted = 0
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch-assess")
+    try:
+        for frame in iter_input(input_path, [id_column] + question_columns, chunk_size):
+            _, scores = score_matrix(answers_to_matrix(frame, question_columns), question_traits, traits)
+            for respondent_id, row_scores in zip(frame[id_column].astype(str), scores_to_dicts(traits, scores)):
+                if respondent_id in done_ids:
+                    with counts_lock:
+                        counts["skipped"] += 1
+                    continue
+                if not row_scores:
+                    fail(respondent_id, "no answers")
+                    continue
+                if limit is not None and submitted >= limit:
+                    break
+                inflight.acquire()   # backpressure: blocks while the pool is saturated
+                pool.submit(task, respondent_id, row_scores)
+                submitted += 1
+            if limit is not None and submitted >= limit:
+                break
+    except KeyboardInterrupt:
+        print("[batch] interrupted; finishing in-flight respondents (rerun to resume)")
+    finally:
+        pool.shutdown(wait=True)
+        results.close()
+        errors.close()
+    return counts["done"], counts["failed"], counts["skipped"]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score, report and index a file of collected answers.")
+    parser.add_argument("input", help="answers file, one row per respondent (.csv or .parquet)")
+    parser.add_argument("--mapping", required=True,
+                        help="JSON: {column: trait} or a generated question set (columns q0..qN)")
+    parser.add_argument("--id-column", required=True, help="respondent ID column; also the chatbot user ID")
+    parser.add_argument("--output", required=True, help="results JSONL; also the resume checkpoint")
+    parser.add_argument("--workers", type=int, default=LLM_MAX_CONCURRENCY,
+                        help="concurrent reports (default: LLM_MAX_CONCURRENCY)")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="rows read and scored at a time")
+    parser.add_argument("--no-index", action="store_true", help="don't store reports in the vector store")
+    parser.add_argument("--limit", type=int, help="stop after this many new respondents")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.input):
+        parser.error(f"input file not found: {args.input}")
+    start = time.perf_counter()
+    done, failed, skipped = run_batch(
+        args.input, args.output, load_mapping(args.mapping), args.id_column,
+        workers=args.workers, chunk_size=args.chunk_size, index=not args.no_index, limit=args.limit
+    )
+    elapsed = time.perf_counter() - start
+    print(f"Assessed {done} respondents ({failed} failed, {skipped} already done) in {elapsed:.1f}s -> {args.output}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,170 @@
+# benchmarks/ann_bench.py
+# ================================
+# ANN INDEX RECALL / LATENCY BENCHMARK
+# ================================
+# Builds the vector store's index types (see vector_store.build_index) over
+# a synthetic corpus of normalized, clustered vectors, shaped like sentence
+# embeddings. Each type is measured against exact flat search:
+#   - build time and serialized index size
+#   - single-query latency p50/p95
+#   - recall@k against the exact top k
+# IVF-PQ is reported both raw and after the exact re-scoring the store does.
+#
+#   python -m benchmarks.ann_bench --n 1000000 --queries 500
+#   python -m benchmarks.ann_bench --n 200000 --nprobe 8 16 32 --ef 32 64 128
+import argparse
+import json
+import sys
+import time
+
+import faiss
+import numpy as np
+
+from vector_store import build_index, train_ivfpq
+
+
+def synthetic_corpus(n, dimension, clusters, seed=0):
+    """Unit vectors drawn around `clusters` random topic centres."""
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((clusters, dimension)).astype("float32")
+    out = np.empty((n, dimension), dtype="float32")
+    for start in range(0, n, 100_000):
+        stop = min(n, start + 100_000)
+        rows = centres[rng.integers(0, clusters, stop - start)]
+        rows += 0.6 * rng.standard_normal(rows.shape).astype("float32")
+        out[start:stop] = rows / np.linalg.norm(rows, axis=1, keepdims=True)
+    return out
+
+
+def make_queries(corpus, count, seed=1):
+    """Perturbed corpus points, so every query has true near neighbours."""
+    rng = np.random.default_rng(seed)
+    q = corpus[rng.choice(len(corpus), count, replace=False)]
+    q = q + 0.05 * rng.standard_normal(q.shape).astype("float32")
+    return (q / np.linalg.norm(q, axis=1, keepdims=True)).astype("float32")
+
+
+def recall(found, truth):
+    k = truth.shape[1]
+    return float(np.mean([len(set(f[:k]) & set(t)) / k for f, t in zip(found, truth)]))
+
+
+def timed_search(index, queries, k, params=None):
+    """Single-query searches (as the app issues them): labels, latency list."""
+    labels = np.empty((len(queries), k), dtype="int64")
+    latencies = []
+    for i, q in enumerate(queries):
+        start = time.perf_counter()
+        _, labels[i] = index.search(q[None], k, params=params)
+        latencies.append(time.perf_counter() - start)
+    return labels, latencies
+
+
+def rerank(corpus, queries, candidates, k):
+    out = np.empty((len(queries), k), dtype="int64")
+    for i, (q, cand) in enumerate(zip(queries, candidates)):
+        cand = cand[cand >= 0]
+        d = ((corpus[cand] - q) ** 2).sum(axis=1)
+        out[i] = cand[np.argsort(d)[:k]]
+    return out
+
+
+def row(name, build_s, size, labels, latencies, truth, extra=None):
+    lat = np.asarray(latencies) * 1000
+    out = {
+        "index": name,
+        "build_s": round(build_s, 2),
+        "size_mb": round(size / 2**20, 1),
+        "p50_ms": round(float(np.percentile(lat, 50)), 3),
+        "p95_ms": round(float(np.percentile(lat, 95)), 3),
+        "recall": round(recall(labels, truth), 4),
+    }
+    out.update(extra or {})
+    return out
+
+
+def run(args):
+    print(f"Generating {args.n} x {args.dimension} corpus ...", flush=True)
+    corpus = synthetic_corpus(args.n, args.dimension, args.clusters)
+    queries = make_queries(corpus, args.queries)
+    ids = np.arange(args.n, dtype="int64")
+    results = []
+
+    start = time.perf_counter()
+    flat = build_index(corpus, ids, "flat")
+    build_s = time.perf_counter() - start
+    truth, latencies = timed_search(flat, queries, args.k)
+    results.append(row("flat", build_s, args.n * args.dimension * 4, truth, latencies, truth))
+    del flat
+
+    if "ivfpq" in args.types:
+        start = time.perf_counter()
+        trained = train_ivfpq(corpus, nlist=args.nlist, m=args.pq_m)
+        index = build_index(corpus, ids, "ivfpq", min_vectors=0, trained=trained)
+        build_s = time.perf_counter() - start
+        size = len(faiss.serialize_index(index))
+        for nprobe in args.nprobe:
+            params = faiss.SearchParametersIVF(nprobe=nprobe)
+            labels, latencies = timed_search(index, queries, args.k, params)
+            results.append(row("ivfpq", build_s, size, labels, latencies, truth,
+                               {"nprobe": nprobe, "nlist": index.nlist, "rerank": 0}))
+            fetch = args.k * args.rerank
+            candidates, latencies = timed_search(index, queries, fetch, params)
+            start = time.perf_counter()
+            labels = rerank(corpus, queries, candidates, args.k)
+            per_query = (time.perf_counter() - start) / len(queries)
+            results.append(row("ivfpq", build_s, size, labels, [l + per_query for l in latencies], truth,
+                               {"nprobe": nprobe, "nlist": index.nlist, "rerank": args.rerank}))
+        del index
+
+    if "hnsw" in args.types:
+        start = time.perf_counter()
+        index = build_index(corpus, ids, "hnsw", min_vectors=0, hnsw_m=args.hnsw_m)
+        build_s = time.perf_counter() - start
+        size = len(faiss.serialize_index(index))
+        for ef in args.ef:
+            labels, latencies = timed_search(index, queries, args.k, faiss.SearchParametersHNSW(efSearch=ef))
+            results.append(row("hnsw", build_s, size, labels, latencies, truth, {"ef_search": ef, "m": args.hnsw_m}))
+        del index
+
+    return {
+        "config": {"n": args.n, "dimension": args.dimension, "clusters": args.clusters,
+                   "queries": args.queries, "k": args.k, "threads": faiss.omp_get_max_threads()},
+        "results": results,
+    }
+
+
+def print_table(result):
+    print(f"{'index':<8}{'params':<36}{'build s':>9}{'MB':>9}{'p50 ms':>9}{'p95 ms':>9}{'recall':>8}")
+    for r in result["results"]:
+        params = ", ".join(f"{k}={r[k]}" for k in ("nlist", "nprobe", "rerank", "m", "ef_search") if k in r)
+        print(f"{r['index']:<8}{params:<36}{r['build_s']:>9}{r['size_mb']:>9}{r['p50_ms']:>9}{r['p95_ms']:>9}{r['recall']:>8}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Recall/latency of the vector store's ANN index types vs flat.")
+    parser.add_argument("--n", type=int, default=200_000, help="corpus size (up to 1M+; ~1.5 GB per 1M at 384-d)")
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--clusters", type=int, default=1000, help="topic centres in the synthetic corpus")
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--k", type=int, default=4, help="neighbours per query (RAG_TOP_K)")
+    parser.add_argument("--types", nargs="+", default=["ivfpq", "hnsw"], choices=["ivfpq", "hnsw"])
+    parser.add_argument("--nlist", type=int, default=0, help="IVF lists (0 = about 4 * sqrt(n))")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[8, 16, 32])
+    parser.add_argument("--pq-m", type=int, default=48, help="PQ bytes per vector")
+    parser.add_argument("--rerank", type=int, default=4, help="IVF-PQ candidates re-scored per result")
+    parser.add_argument("--hnsw-m", type=int, default=32)
+    parser.add_argument("--ef", type=int, nargs="+", default=[32, 64, 128])
+    parser.add_argument("--output", help="also write the result JSON here")
+    args = parser.parse_args(argv)
+
+    result = run(args)
+    print_table(result)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,174 @@
+# benchmarks/embed_bench.py
+# ================================
+# EMBEDDING BACKEND SPEED / FIDELITY BENCHMARK
+# ================================
+# Compares the PyTorch SentenceTransformer with the ONNX backend
+# (onnx_embedder.py) in fp32 and int8, on report-style sentences:
+#   - single-text latency p50/p95 (a chat query)
+#   - batch throughput (indexing a report)
+#   - concurrent single-text throughput from N threads, directly and through
+#     the MicroBatcher (many sessions chatting at once)
+#   - fidelity against the torch vectors: mean/min cosine and how many of
+#     each text's top-k neighbours are unchanged
+#
+# Exits non-zero when an ONNX variant's mean cosine falls below --min-cosine:
+#
+#   python -m benchmarks.embed_bench --threads 8
+#   python -m benchmarks.embed_bench --texts 2000 --output embed.json
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from model_registry import EMBED_MODEL_NAME
+from onnx_embedder import (EMBED_ONNX_DIR, MODEL_FILES, MicroBatcher, OnnxEmbedder,
+                           default_threads, export_onnx)
+
+TRAITS = ["openness", "conscientiousness", "extraversion", "agreeableness", "neuroticism"]
+OPENERS = ["You tend to", "You often", "People notice that you", "At work you", "Under stress you may"]
+ACTIONS = [
+    "enjoy exploring new ideas and unfamiliar places",
+    "plan your week carefully and keep your promises",
+    "recharge by spending quiet time on your own",
+    "look for ways to help the people around you",
+    "worry about small details before a deadline",
+    "take the lead when a group loses direction",
+    "prefer clear routines over last-minute changes",
+    "speak up when something feels unfair",
+]
+QUESTIONS = ["What are my strengths?", "How can I handle stress better?", "Which careers suit me?",
+             "Why do I avoid conflict?", "How do I work best in a team?"]
+
+
+def sample_texts(count, seed=0):
+    """Report lines and chat questions of mixed length."""
+    rng = random.Random(seed)
+    texts = []
+    while len(texts) < count:
+        if rng.random() < 0.2:
+            texts.append(rng.choice(QUESTIONS))
+            continue
+        sentences = [f"{rng.choice(OPENERS)} {rng.choice(ACTIONS)}, which reflects your "
+                     f"{rng.choice(TRAITS)}." for _ in range(rng.randint(1, 4))]
+        texts.append(" ".join(sentences))
+    return texts
+
+
+def latency(model, texts):
+    lat = []
+    for t in texts:
+        start = time.perf_counter()
+        model.encode([t])
+        lat.append(time.perf_counter() - start)
+    lat = np.asarray(lat) * 1000
+    return round(float(np.percentile(lat, 50)), 3), round(float(np.percentile(lat, 95)), 3)
+
+
+def throughput(fn, count):
+    start = time.perf_counter()
+    fn()
+    return round(count / (time.perf_counter() - start), 1)
+
+
+def concurrent_throughput(model, texts, threads):
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        return throughput(lambda: list(pool.map(lambda t: model.encode([t]), texts)), len(texts))
+
+
+def neighbours(vectors, k):
+    sims = vectors @ vectors.T
+    np.fill_diagonal(sims, -np.inf)
+    return np.argsort(-sims, axis=1)[:, :k]
+
+
+def fidelity(vectors, reference, k):
+    cos = (vectors * reference).sum(axis=1)
+    ours, theirs = neighbours(vectors, k), neighbours(reference, k)
+    overlap = np.mean([len(set(a) & set(b)) / k for a, b in zip(ours, theirs)])
+    return {"cos_mean": round(float(cos.mean()), 5), "cos_min": round(float(cos.min()), 5),
+            f"top{k}_overlap": round(float(overlap), 4)}
+
+
+def run(args):
+    from sentence_transformers import SentenceTransformer
+
+    texts = sample_texts(args.texts)
+    probes = texts[:args.queries]
+    if not all(os.path.exists(os.path.join(args.onnx_dir, MODEL_FILES[p])) for p in args.precisions):
+        export_onnx(args.model, args.onnx_dir, quantize="int8" in args.precisions)
+
+    backends = {"torch": SentenceTransformer(args.model, device="cpu")}
+    for precision in args.precisions:
+        backends[f"onnx-{precision}"] = OnnxEmbedder(args.onnx_dir, precision, threads=args.intra_threads)
+
+    reference = None
+    results = []
+    for name, model in backends.items():
+        model.encode(texts[:8])   # warm-up
+        vectors = np.asarray(model.encode(texts, batch_size=args.batch_size), dtype=np.float32)
+        if reference is None:
+            reference = vectors
+        p50, p95 = latency(model, probes)
+        results.append(dict({
+            "backend": name,
+            "p50_ms": p50,
+            "p95_ms": p95,
+            "batch_per_s": throughput(lambda: model.encode(texts, batch_size=args.batch_size), len(texts)),
+            "concurrent_per_s": concurrent_throughput(model, probes, args.threads),
+        }, **fidelity(vectors, reference, args.k)))
+        if name.startswith("onnx"):
+            batcher = MicroBatcher(model)
+            results.append({"backend": name + "+batcher",
+                            "concurrent_per_s": concurrent_throughput(batcher, probes, args.threads),
+                            "mean_batch": round(batcher.stats["texts"] / max(batcher.stats["batches"], 1), 1)})
+
+    return {
+        "config": {"model": args.model, "texts": len(texts), "queries": len(probes), "threads": args.threads,
+                   "intra_op_threads": args.intra_threads or default_threads(), "batch_size": args.batch_size},
+        "results": results,
+    }
+
+
+def print_table(result):
+    cols = ["p50_ms", "p95_ms", "batch_per_s", "concurrent_per_s", "mean_batch", "cos_mean", "cos_min"]
+    overlap = next((c for r in result["results"] for c in r if c.endswith("_overlap")), None)
+    cols += [overlap] if overlap else []
+    print(f"{'backend':<22}" + "".join(f"{c:>18}" for c in cols))
+    for r in result["results"]:
+        print(f"{r['backend']:<22}" + "".join(f"{str(r.get(c, '')):>18}" for c in cols))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Speed and cosine fidelity of the ONNX embedding backend vs torch.")
+    parser.add_argument("--model", default=EMBED_MODEL_NAME)
+    parser.add_argument("--onnx-dir", default=EMBED_ONNX_DIR, help="exported model (created if missing)")
+    parser.add_argument("--precisions", nargs="+", default=["fp32", "int8"], choices=list(MODEL_FILES))
+    parser.add_argument("--texts", type=int, default=1000, help="corpus size for batch and fidelity")
+    parser.add_argument("--queries", type=int, default=200, help="single-text encodes for latency")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--threads", type=int, default=8, help="concurrent callers")
+    parser.add_argument("--intra-threads", type=int, default=0, help="onnxruntime threads (0 = default)")
+    parser.add_argument("--k", type=int, default=4, help="neighbours compared for fidelity (RAG_TOP_K)")
+    parser.add_argument("--min-cosine", type=float, default=0.98, help="fail below this mean cosine")
+    parser.add_argument("--output", help="also write the result JSON here")
+    args = parser.parse_args(argv)
+
+    result = run(args)
+    print_table(result)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+    failed = [r["backend"] for r in result["results"] if r.get("cos_mean", 1.0) < args.min_cosine]
+    if failed:
+        print(f"FIDELITY: mean cosine below {args.min_cosine} for {', '.join(failed)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+# benchmarks/fake_llm_server.py
+# ================================
+# FAKE CHAT-COMPLETIONS SERVER
+# ================================
+# Speaks enough of the OpenAI-compatible Groq API (/openai/v1/...) for the
+# app's GroqBackend: blocking and SSE-streaming chat completions plus the
+# models list used for connection warm-up. Replies come from the offline
+# LocalBackend, delivered with a configurable time-to-first-token and
+# token rate so benchmarks see realistic, repeatable latency.
+#
+#   python -m benchmarks.fake_llm_server --port 8765 --latency 0.4 --tokens-per-sec 250
+import argparse
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from llm_gateway import LocalBackend
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            self._send_json(200, {"object": "list", "data": [{"id": "fake", "object": "model"}]})
+        else:
+            self._send_json(404, {"error": {"message": "not found"}})
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "not found"}})
+            return
+        length = int(self.headers.get("Content-Length", "0"))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        server = self.server
+        text = server.backend._reply(request.get("messages", []))
+        tokens = re.findall(r"\S+\s*|\s+", text)
+        model = request.get("model", "fake")
+        usage = {
+            "prompt_tokens": sum(len(m.get("content", "").split()) for m in request.get("messages", [])),
+            "completion_tokens": len(tokens),
+        }
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+
+        time.sleep(server.latency)
+        if request.get("stream"):
+            self._stream(model, tokens, usage)
+            return
+
+        time.sleep(len(tokens) / server.tokens_per_sec)
+        self._send_json(200, {
+            "id": "chatcmpl-fake", "object": "chat.completion", "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": text}}],
+            "usage": usage,
+        })
+
+    def _stream(self, model, tokens, usage):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def event(delta, finish=None, extra=None):
+            body = {
+                "id": "chatcmpl-fake", "object": "chat.completion.chunk",
+                "created": int(time.time()), "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish}],
+            }
+            if extra:
+                body.update(extra)
+            self.wfile.write(f"data: {json.dumps(body)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        interval = 1.0 / self.server.tokens_per_sec
+        event({"role": "assistant", "content": ""})
+        for token in tokens:
+            event({"content": token})
+            time.sleep(interval)
+        event({}, finish="stop", extra={"x_groq": {"usage": usage}})
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+
+class FakeLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.3, tokens_per_sec=200.0):
+        super().__init__((host, port), _Handler)
+        self.latency = latency
+        self.tokens_per_sec = tokens_per_sec
+        self.backend = LocalBackend(latency=0)
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """Serve from a daemon thread; returns self."""
+        threading.Thread(target=self.serve_forever, name="fake-llm", daemon=True).start()
+        return self
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fake Groq/OpenAI chat-completions server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.3, help="seconds before the first token")
+    parser.add_argument("--tokens-per-sec", type=float, default=200.0)
+    args = parser.parse_args(argv)
+
+    server = FakeLLMServer(args.host, args.port, args.latency, args.tokens_per_sec)
+    print(f"Fake LLM server on {server.base_url} (set GROQ_BASE_URL to this)")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
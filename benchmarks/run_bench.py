@@ -0,0 +1,230 @@
+# benchmarks/run_bench.py
+# ================================
+# END-TO-END LATENCY BENCHMARK
+# ================================
+# Drives the assessment pipeline headlessly, the same way one user session
+# does: generate questions, score answers, generate the report, index it,
+# then ask a few chat questions. LLM calls go to a local fake server with
+# fixed latency and token rate, so only our own overhead varies.
+#
+# Reports p50/p95/p99 per stage, end-to-end throughput for N concurrent
+# simulated users, and the section precision of chunk retrieval over every
+# indexed bench user (report_chunker.retrieval_precision). It compares the
+# results against a JSON baseline and exits non-zero on a regression:
+#
+#   python -m benchmarks.run_bench --users 8 --rounds 3 --save-baseline
+#   python -m benchmarks.run_bench --users 8 --rounds 3      # compare
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+STAGES = ["generate_personality_questions", "score_answers", "generate_report",
+          "store_in_faiss", "rag_chat"]
+CHAT_QUESTIONS = [
+    "What are my strengths?",
+    "What should I work on?",
+    "How can I handle stress better?",
+]
+PRECISION_SLACK = 0.02   # absolute drop in retrieval precision tolerated
+BASELINE_DIR = os.path.join(os.path.dirname(__file__), "baselines")
+
+
+def percentiles(samples):
+    a = np.asarray(samples, dtype=np.float64) * 1000.0
+    return {
+        "count": int(a.size),
+        "p50_ms": round(float(np.percentile(a, 50)), 2),
+        "p95_ms": round(float(np.percentile(a, 95)), 2),
+        "p99_ms": round(float(np.percentile(a, 99)), 2),
+        "mean_ms": round(float(a.mean()), 2),
+    }
+
+
+def _configure_env(args):
+    """Point the app's modules at the fake server and a throwaway store.
+
+    Must run before any app module is imported: the gateway, vector store
+    and caches read their configuration at import time.
+    """
+    os.environ["LLM_BACKEND"] = "groq"
+    # the fake server ignores the key, but the client requires one
+    os.environ.setdefault("GROQ_API_KEY", "fake-llm-server")
+    os.environ["LLM_RATE_PER_SEC"] = "1000"
+    os.environ["LLM_BURST"] = "1000"
+    os.environ["LLM_MAX_CONCURRENCY"] = str(max(args.users * 2, 8))
+    os.environ["VECTOR_STORE_DIR"] = tempfile.mkdtemp(prefix="bench-store-")
+    if not args.with_cache:
+        # measure the uncached path; every simulated user asks the same thing
+        os.environ["SEMANTIC_CACHE_THRESHOLD"] = "2"
+        os.environ["REPORT_CACHE_MAX_MB"] = "0"
+    else:
+        os.environ["REPORT_CACHE_PATH"] = os.path.join(tempfile.mkdtemp(prefix="bench-reports-"), "reports.sqlite3")
+
+
+def simulate_user(user_no, core, score_answers):
+    """One session's worth of calls; returns ({stage: [seconds, ...]}, user ID)."""
+    timings = {stage: [] for stage in STAGES}
+    rng = random.Random(user_no)
+    user_id = f"bench-user-{user_no}-{time.time_ns()}"
+
+    def timed(stage, fn, *a):
+        start = time.perf_counter()
+        result = fn(*a)
+        timings[stage].append(time.perf_counter() - start)
+        return result
+
+    questions = timed("generate_personality_questions", core.generate_personality_questions)
+    if not questions or "error" in questions[0]:
+        raise RuntimeError("question generation failed against the fake server")
+    answers = [{"trait": q["trait"], "value": rng.randint(1, 5)} for q in questions]
+    scores = timed("score_answers", score_answers, answers)
+    report = timed("generate_report", core.generate_report, scores)
+    timed("store_in_faiss", core.store_in_faiss, report, user_id, {"scores": scores})
+    for question in CHAT_QUESTIONS:
+        timed("rag_chat", core.rag_chat, question, user_id)
+    return timings, user_id
+
+
+def run(args):
+    _configure_env(args)
+    from benchmarks.fake_llm_server import FakeLLMServer
+    server = FakeLLMServer(latency=args.latency, tokens_per_sec=args.tokens_per_sec).start()
+    # read when the gateway builds its client, on importing assessment
+    os.environ["GROQ_BASE_URL"] = server.base_url
+
+    import assessment as core
+    from model_registry import get_embed_model
+    from report_chunker import retrieval_precision
+    from scoring import score_answers
+
+    # keep model load out of the measurements
+    get_embed_model().encode(["warm-up"])
+    simulate_user(-1, core, score_answers)
+
+    samples = {stage: [] for stage in STAGES}
+    user_ids = []
+    sessions = 0
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.users) as pool:
+        for round_no in range(args.rounds):
+            futures = [pool.submit(simulate_user, round_no * args.users + u, core, score_answers)
+                       for u in range(args.users)]
+            for f in futures:
+                timings, user_id = f.result()
+                for stage, values in timings.items():
+                    samples[stage].extend(values)
+                user_ids.append(user_id)
+                sessions += 1
+    elapsed = time.perf_counter() - start
+    server.shutdown()
+
+    # outside the timed section: does retrieval return the asked-about section?
+    precision = [retrieval_precision(lambda q, u=u: core.retrieve_chunks(q, u)) for u in user_ids]
+
+    return {
+        "config": {
+            "users": args.users, "rounds": args.rounds, "latency": args.latency,
+            "tokens_per_sec": args.tokens_per_sec, "with_cache": args.with_cache,
+        },
+        "stages": {stage: percentiles(values) for stage, values in samples.items()},
+        "throughput": {
+            "sessions": sessions,
+            "seconds": round(elapsed, 3),
+            "sessions_per_sec": round(sessions / elapsed, 3),
+        },
+        "retrieval": {
+            "users": len(precision),
+            "precision": round(float(np.mean(precision)), 4) if precision else 0.0,
+        },
+    }
+
+
+def compare(result, baseline, tolerance):
+    """List of human-readable regressions (empty if none)."""
+    problems = []
+    for stage, stats in result["stages"].items():
+        base = baseline["stages"].get(stage)
+        if not base:
+            continue
+        for key in ("p50_ms", "p95_ms"):
+            # small absolute slack so sub-millisecond stages don't flap
+            limit = base[key] * (1 + tolerance) + 1.0
+            if stats[key] > limit:
+                problems.append(f"{stage} {key}: {stats[key]} > {round(limit, 2)} (baseline {base[key]})")
+    base_tp = baseline["throughput"]["sessions_per_sec"]
+    if result["throughput"]["sessions_per_sec"] < base_tp * (1 - tolerance):
+        problems.append(
+            f"throughput: {result['throughput']['sessions_per_sec']} sessions/s "
+            f"< {round(base_tp * (1 - tolerance), 3)} (baseline {base_tp})"
+        )
+    base_precision = baseline.get("retrieval", {}).get("precision")
+    precision = result["retrieval"]["precision"]
+    if base_precision is not None and precision < base_precision - PRECISION_SLACK:
+        problems.append(f"retrieval precision: {precision} < {round(base_precision - PRECISION_SLACK, 4)} "
+                        f"(baseline {base_precision})")
+    return problems
+
+
+def print_table(result):
+    print(f"{'stage':<32}{'n':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for stage, s in result["stages"].items():
+        print(f"{stage:<32}{s['count']:>6}{s['p50_ms']:>10}{s['p95_ms']:>10}{s['p99_ms']:>10}")
+    tp = result["throughput"]
+    print(f"throughput: {tp['sessions_per_sec']} sessions/s ({tp['sessions']} sessions in {tp['seconds']}s)")
+    r = result["retrieval"]
+    print(f"retrieval precision: {r['precision']} (section match over {r['users']} indexed users)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="End-to-end latency benchmark against a fake LLM server.")
+    parser.add_argument("--users", type=int, default=4, help="concurrent simulated users")
+    parser.add_argument("--rounds", type=int, default=3, help="sessions per simulated user")
+    parser.add_argument("--latency", type=float, default=0.2, help="fake server time-to-first-token (s)")
+    parser.add_argument("--tokens-per-sec", type=float, default=500.0, help="fake server token rate")
+    parser.add_argument("--with-cache", action="store_true", help="leave the answer and report caches on")
+    parser.add_argument("--baseline", help="baseline JSON (default: benchmarks/baselines/u<users>.json)")
+    parser.add_argument("--save-baseline", action="store_true", help="write this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown")
+    parser.add_argument("--output", help="also write the full result JSON here")
+    args = parser.parse_args(argv)
+
+    result = run(args)
+    print_table(result)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+    baseline_path = args.baseline or os.path.join(BASELINE_DIR, f"u{args.users}.json")
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(baseline_path), exist_ok=True)
+        with open(baseline_path, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        print(f"Baseline written to {baseline_path}")
+        return 0
+    if not os.path.exists(baseline_path):
+        print(f"No baseline at {baseline_path}; run with --save-baseline to create one.")
+        return 0
+
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline.get("config") != result["config"]:
+        print("WARNING: baseline was recorded with a different configuration:", baseline.get("config"))
+    problems = compare(result, baseline, args.tolerance)
+    if problems:
+        print("\n!!! PERFORMANCE REGRESSION against", baseline_path)
+        for p in problems:
+            print("  -", p)
+        return 1
+    print(f"OK: within {int(args.tolerance * 100)}% of {baseline_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
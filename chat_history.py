@@ -0,0 +1,73 @@
+# chat_history.py
+# ================================
+# BOUNDED CHAT HISTORY
+# ================================
+# A session keeps only its most recent chat messages in memory. Older ones
+# are appended to a per-user JSONL archive on disk, so memory stays flat
+# however long the conversation runs. The archive is only read when the
+# user pages back with "Load older messages".
+#
+# Messages are numbered 0..len(history)-1 across archive and memory:
+# indexes below `archived` are lines of the archive file. list(history)
+# is the in-memory part, which is what the session store persists.
+import json
+import os
+from collections import deque
+
+from vector_store import user_key
+
+HISTORY_DIR = os.environ.get("CHAT_HISTORY_DIR", os.path.join("data", "chat_history"))
+HISTORY_MAX_MESSAGES = int(os.environ.get("CHAT_HISTORY_MAX_MESSAGES", "50"))
+CHAT_WINDOW = int(os.environ.get("CHAT_WINDOW", "20"))
+
+
+class ChatHistory:
+    def __init__(self, user_id, recent=(), directory=HISTORY_DIR, max_messages=HISTORY_MAX_MESSAGES):
+        self.path = os.path.join(directory, f"{user_key(user_id):016x}.jsonl")
+        self._recent = deque(maxlen=max_messages)
+        # earlier sessions' archived turns stay reachable by paging back
+        self.archived = 0
+        if os.path.exists(self.path):
+            with open(self.path, "rb") as f:
+                self.archived = sum(1 for _ in f)
+        # in-memory turns restored from the session store
+        for message in recent:
+            self.append(message)
+
+    def __len__(self):
+        return self.archived + len(self._recent)
+
+    def __iter__(self):
+        """In-memory (recent) messages only."""
+        return iter(self._recent)
+
+    def append(self, message):
+        if len(self._recent) == self._recent.maxlen:
+            self._archive(self._recent[0])
+        self._recent.append(message)
+
+    def _archive(self, message):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(message) + "\n")
+        self.archived += 1
+
+    def messages(self, start, stop=None):
+        """Messages start..stop-1 in conversation order, from archive or memory."""
+        stop = len(self) if stop is None else min(stop, len(self))
+        start = max(0, start)
+        out = []
+        if start < self.archived:
+            with open(self.path, encoding="utf-8") as f:
+                for i, line in enumerate(f):
+                    if i >= min(stop, self.archived):
+                        break
+                    if i >= start:
+                        out.append(json.loads(line))
+        recent = list(self._recent)
+        out.extend(recent[max(start - self.archived, 0):max(stop - self.archived, 0)])
+        return out
+
+    def window(self, count):
+        """The last `count` messages; only touches disk if count exceeds memory."""
+        return self.messages(len(self) - count)
@@ -0,0 +1,228 @@
+# chat_memory.py
+# ================================
+# ROLLING CHAT MEMORY + TOKEN-BUDGETED RAG PROMPT
+# ================================
+# Follow-up questions ("and how do I fix that?") need the conversation, but
+# replaying the whole chat would make every turn's prompt, latency and cost
+# grow without bound. Instead each chat keeps
+#   - the last few turns verbatim, and
+#   - a short running summary of everything older.
+# Once the verbatim turns exceed CHAT_MEMORY_RECENT_TOKENS, the oldest ones
+# are folded into the summary by one LLM call in the background, so the user
+# never waits for it. Each fold adds only the new turns to the previous
+# summary.
+#
+# build_rag_prompt() packs the retrieved profile chunks (best first) into
+# RAG_PROMPT_BUDGET tokens, plus the summary and the newest turns when the
+# question is a follow-up. Token counts use the gateway's
+# ~4-characters-per-token estimate.
+#
+# Conversation context trades against the semantic answer cache. An answer
+# written with it depends on the conversation, so it is cached under that
+# exact conversation, and that key changes every turn. Only follow-ups
+# ("why is that?", "and at work?") get the conversation. Standalone
+# questions are answered from the profile alone and keep the chunk-only
+# cache key, so repeats hit within and across sessions.
+import hashlib
+import os
+import re
+import threading
+
+import metrics
+from llm_gateway import approx_tokens
+from report_chunker import format_chunks
+
+RAG_PROMPT_BUDGET = int(os.environ.get("RAG_PROMPT_BUDGET", "1500"))
+CHAT_MEMORY_SHARE = float(os.environ.get("CHAT_MEMORY_SHARE", "0.35"))   # of what the question leaves
+CHAT_MEMORY_RECENT_TOKENS = int(os.environ.get("CHAT_MEMORY_RECENT_TOKENS", "400"))
+CHAT_SUMMARY_TOKENS = int(os.environ.get("CHAT_SUMMARY_TOKENS", "200"))
+
+_KEEP_TURNS = 2   # a fold always leaves the latest exchange verbatim
+# Questions that lean on earlier turns: a connective opener, a reference
+# back ("that", "you said", "more"), or too short to stand alone
+_FOLLOW_UP = re.compile(
+    r"^\s*(and|but|so|also|then|what about|how about|how so|why not)\b"
+    r"|\b(it|that|this|those|these|them|they|above|earlier|before|previous|"
+    r"you said|you mentioned|again|more|else|instead|another|other one)\b",
+    re.I
+)
+
+RAG_TEMPLATE = """
+Based only on this personality profile:
+
+{profile}
+{conversation}
+Answer the user's question in plain text, not JSON.
+Answer in second person always try to address the user with you, your etc.
+Use bullet points if multiple items, and make it friendly and readable.
+
+QUESTION: {question}
+"""
+
+SUMMARY_TEMPLATE = """
+Update the running summary of a coaching chat about the user's personality profile.
+
+Summary so far:
+{summary}
+
+New messages:
+{messages}
+
+Write the updated summary in at most {words} words of plain text. Keep what the
+user told about themselves, their goals and worries, and the advice already
+given. Reply with the summary only.
+"""
+
+
+def truncate_tokens(text, tokens):
+    """`text` cut to about `tokens` tokens, on a word boundary."""
+    if approx_tokens(text) <= tokens:
+        return text
+    cut = text[:max(0, tokens) * 4]
+    return cut[:cut.rfind(" ")].rstrip() + " ..." if " " in cut else cut
+
+
+def is_follow_up(question):
+    """Whether `question` likely needs the earlier conversation to be answered."""
+    return len(question.split()) <= 3 or bool(_FOLLOW_UP.search(question))
+
+
+def conversation_fingerprint(conversation):
+    """Cache-key part for the conversation text packed into a prompt."""
+    return hashlib.sha1(conversation.encode("utf-8")).hexdigest() if conversation else ""
+
+
+def _format_turn(turn):
+    speaker = "User" if turn["role"] == "user" else "Coach"
+    return f"{speaker}: {turn['message']}"
+
+
+class ChatMemory:
+    """Running summary plus verbatim recent turns of one user's chat.
+
+    `summarize(prompt)` is the LLM call that produces a summary and
+    `submit(fn)` runs it in the background. state() / the `state` argument
+    round-trip through the session store.
+    """
+
+    def __init__(self, summarize, submit, state=None, recent_tokens=CHAT_MEMORY_RECENT_TOKENS,
+                 summary_tokens=CHAT_SUMMARY_TOKENS):
+        state = state or {}
+        self._summarize = summarize
+        self._submit = submit
+        self.recent_tokens = recent_tokens
+        self.summary_tokens = summary_tokens
+        self.summary = state.get("summary", "")
+        self.summarized = state.get("summarized", 0)   # turns folded into the summary
+        self._recent = list(state.get("recent", ()))
+        self._lock = threading.Lock()
+        self._folding = False
+
+    @classmethod
+    def from_history(cls, summarize, submit, messages):
+        """Memory for a chat that predates it, seeded with its recent messages."""
+        return cls(summarize, submit, {"recent": list(messages)})
+
+    def state(self):
+        with self._lock:
+            return {"summary": self.summary, "summarized": self.summarized, "recent": list(self._recent)}
+
+    def snapshot(self):
+        """(summary, recent turns) as of now."""
+        with self._lock:
+            return self.summary, list(self._recent)
+
+    def add(self, question, answer):
+        """Record a finished exchange; folds old turns in the background if due."""
+        with self._lock:
+            self._recent.append({"role": "user", "message": question})
+            self._recent.append({"role": "ai", "message": answer})
+            due = not self._folding and sum(approx_tokens(t["message"]) for t in self._recent) > self.recent_tokens
+            if due:
+                self._folding = True
+        if due:
+            self._submit(self._fold)
+
+    def _fold(self):
+        with self._lock:
+            # keep the newest turns that fit in half the verbatim budget, fold the rest
+            n = len(self._recent)
+            keep = min(_KEEP_TURNS, n)
+            kept = sum(approx_tokens(t["message"]) for t in self._recent[n - keep:])
+            while keep < n and kept + approx_tokens(self._recent[n - keep - 1]["message"]) <= self.recent_tokens // 2:
+                kept += approx_tokens(self._recent[n - keep - 1]["message"])
+                keep += 1
+            count = n - keep
+            old, summary = self._recent[:count], self.summary
+        try:
+            if old:
+                prompt = SUMMARY_TEMPLATE.format(
+                    summary=summary or "(none yet)",
+                    messages="\n".join(_format_turn(t) for t in old),
+                    words=int(self.summary_tokens * 0.75)
+                )
+                new_summary = truncate_tokens(self._summarize(prompt).strip(), self.summary_tokens)
+                with self._lock:
+                    # turns are only ever appended, so `old` is still the prefix
+                    self.summary = new_summary
+                    self.summarized += count
+                    del self._recent[:count]
+                metrics.inc("chat_memory_folds_total")
+        except Exception as e:
+            print("[chat_memory] summary update failed, keeping turns verbatim:", e)
+        finally:
+            with self._lock:
+                self._folding = False
+
+
+def build_rag_prompt(question, chunks, memory=None, budget=RAG_PROMPT_BUDGET):
+    """(prompt, chunks used, conversation text, approx tokens) within `budget`.
+
+    Chunks come best first. If `question` is a follow-up, the memory gets up
+    to CHAT_MEMORY_SHARE of what the question leaves: the summary first,
+    then the newest turns. Chunks fill the rest. The best chunk is always
+    included, truncated if necessary. The conversation text is "" when none
+    was packed.
+    """
+    free = budget - approx_tokens(RAG_TEMPLATE.format(profile="", conversation="", question=question))
+
+    conversation = ""
+    if memory is not None and is_follow_up(question):
+        summary, recent = memory.snapshot()
+        allowance = int(max(free, 0) * CHAT_MEMORY_SHARE)
+        lines = []
+        if summary:
+            summary = truncate_tokens(summary, allowance)
+            allowance -= approx_tokens(summary)
+        turns = []
+        for turn in reversed(recent):
+            line = _format_turn(turn)
+            if approx_tokens(line) > allowance:
+                break
+            allowance -= approx_tokens(line)
+            turns.append(line)
+        if summary:
+            lines.append(f"Earlier in this conversation: {summary}")
+        if turns:
+            lines.append("Recent messages:\n" + "\n".join(reversed(turns)))
+        if lines:
+            conversation = "\n" + "\n\n".join(lines) + "\n"
+            free -= approx_tokens(conversation)
+
+    used = []
+    for chunk in chunks:
+        cost = approx_tokens(chunk["text"]) + 2   # "- " prefix and newline
+        if cost > free:
+            if not used:
+                used.append(dict(chunk, text=truncate_tokens(chunk["text"], max(free - 2, 16))))
+            break
+        used.append(chunk)
+        free -= cost
+    prompt = RAG_TEMPLATE.format(profile=format_chunks(used), conversation=conversation, question=question)
+    # section headers were not counted above; drop chunks until it really fits
+    while len(used) > 1 and approx_tokens(prompt) > budget:
+        used.pop()
+        prompt = RAG_TEMPLATE.format(profile=format_chunks(used), conversation=conversation, question=question)
+    tokens = approx_tokens(prompt)
+    metrics.inc("rag_prompt_tokens_total", tokens)
+    return prompt, used, conversation, tokens
@@ -0,0 +1,71 @@
+# dashboard_figures.py
+# ================================
+# DASHBOARD FIGURES (MEMOIZED)
+# ================================
+# The five Dashboard charts depend only on the score vector, so they are
+# built once per distinct vector and shared by every rerun and every
+# session with the same scores. Cached figures are shared objects: callers
+# must not mutate them.
+import os
+from functools import lru_cache
+
+import plotly.graph_objects as go
+
+import metrics
+
+FIGURE_CACHE_SIZE = int(os.environ.get("DASHBOARD_FIGURE_CACHE_SIZE", "256"))
+BAR_COLORS = ['#ff7eb9','#ff758c','#ff9472','#ffcc70','#70d6ff']
+
+
+def score_key(scores):
+    """Hashable cache key for a {trait: score} dict (order matters for display)."""
+    return tuple(scores.items())
+
+
+@lru_cache(maxsize=FIGURE_CACHE_SIZE)
+def _build(key):
+    traits = [t for t, _ in key]
+    scores = [s for _, s in key]
+
+    # --- Big Five Bar Chart ---
+    fig_bar = go.Figure([go.Bar(x=traits, y=scores, marker_color=BAR_COLORS)])
+    fig_bar.update_layout(title="Big Five Trait Scores", yaxis=dict(range=[0,100]))
+
+    # --- Pie Chart Example ---
+    fig_pie = go.Figure(data=[go.Pie(labels=traits, values=scores, hole=0.3)])
+    fig_pie.update_traces(marker=dict(colors=BAR_COLORS))
+    fig_pie.update_layout(title="Trait Distribution")
+
+    # --- Stacked Area Chart Example ---
+    fig_area = go.Figure()
+    fig_area.add_trace(go.Scatter(x=traits, y=[s*0.8 for s in scores], fill='tozeroy', name='Level 1'))
+    fig_area.add_trace(go.Scatter(x=traits, y=[s*0.6 for s in scores], fill='tonexty', name='Level 2'))
+    fig_area.add_trace(go.Scatter(x=traits, y=[s*0.4 for s in scores], fill='tonexty', name='Level 3'))
+    fig_area.update_layout(title="Trait Progression Over Levels")
+
+    # --- Donut Chart Example ---
+    fig_donut = go.Figure(data=[go.Pie(labels=traits, values=scores, hole=0.5)])
+    fig_donut.update_traces(marker=dict(colors=BAR_COLORS))
+    fig_donut.update_layout(title="Donut Chart of Traits")
+
+    # --- Optional: Stacked Bar Example ---
+    fig_stacked = go.Figure()
+    fig_stacked.add_trace(go.Bar(x=traits, y=[s*0.5 for s in scores], name='Part 1'))
+    fig_stacked.add_trace(go.Bar(x=traits, y=[s*0.3 for s in scores], name='Part 2'))
+    fig_stacked.add_trace(go.Bar(x=traits, y=[s*0.2 for s in scores], name='Part 3'))
+    fig_stacked.update_layout(barmode='stack', title="Stacked Trait Components")
+
+    return fig_bar, fig_pie, fig_area, fig_donut, fig_stacked
+
+
+def dashboard_figures(scores):
+    """(fig_bar, fig_pie, fig_area, fig_donut, fig_stacked) for a score dict."""
+    return _build(score_key(scores))
+
+
+def cache_stats():
+    info = _build.cache_info()
+    return {"hits": info.hits, "misses": info.misses, "entries": info.currsize}
+
+
+metrics.register_collector("dashboard_figures_cache", cache_stats)
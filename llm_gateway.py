@@ -0,0 +1,385 @@
+# llm_gateway.py
+# ================================
+# LLM GATEWAY
+# ================================
+# Every LLM call in the app goes through one process-wide gateway, which
+# provides:
+#   - a single pooled client per backend (HTTP keep-alive reuse)
+#   - a token-bucket rate limiter shared by all sessions
+#   - bounded concurrency, per-request timeouts, jittered retries
+#   - coalescing of identical in-flight (non-streaming) requests
+# Backends are pluggable. "groq" talks to the Groq API and "local" is an
+# offline stub, so the app runs with no network at all.
+#
+#   LLM_BACKEND=local streamlit run app.py
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from concurrent.futures import Future
+
+import metrics
+
+LLM_BACKEND = os.environ.get("LLM_BACKEND", "groq")
+LLM_RATE_PER_SEC = float(os.environ.get("LLM_RATE_PER_SEC", "0.5"))
+LLM_BURST = int(os.environ.get("LLM_BURST", "5"))
+LLM_MAX_CONCURRENCY = int(os.environ.get("LLM_MAX_CONCURRENCY", "8"))
+LLM_TIMEOUT = float(os.environ.get("LLM_TIMEOUT", "60"))
+LLM_MAX_RETRIES = int(os.environ.get("LLM_MAX_RETRIES", "3"))
+
+
+class RetryableError(Exception):
+    """A backend failure worth retrying (rate limit, timeout, 5xx)."""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+# ================================
+# BACKENDS
+# ================================
+class LLMBackend:
+    """Interface for chat-completion providers.
+
+    complete() returns (text, usage) where usage is a dict with
+    prompt_tokens/completion_tokens when the provider reports them.
+    stream() yields text deltas. Transient failures must be raised as
+    RetryableError so the gateway can back off and retry.
+    """
+
+    name = "base"
+
+    def complete(self, model, messages, temperature, timeout):
+        raise NotImplementedError
+
+    def stream(self, model, messages, temperature, timeout):
+        raise NotImplementedError
+
+    def warm(self):
+        """Open a connection ahead of the first real request (optional)."""
+
+
+class GroqBackend(LLMBackend):
+    name = "groq"
+
+    def __init__(self, api_key=None, base_url=None):
+        from groq import Groq
+        # retries are done by the gateway, with a limiter-aware backoff
+        self.client = Groq(
+            api_key=api_key or os.environ.get("GROQ_API_KEY"),
+            base_url=base_url or os.environ.get("GROQ_BASE_URL") or None,
+            max_retries=0,
+        )
+
+    def _translate(self, e):
+        import groq
+        if isinstance(e, (groq.RateLimitError, groq.APITimeoutError,
+                          groq.APIConnectionError, groq.InternalServerError)):
+            retry_after = None
+            response = getattr(e, "response", None)
+            if response is not None:
+                try:
+                    retry_after = float(response.headers.get("retry-after"))
+                except (TypeError, ValueError):
+                    pass
+            return RetryableError(str(e), retry_after)
+        return e
+
+    def complete(self, model, messages, temperature, timeout):
+        try:
+            completion = self.client.chat.completions.create(
+                model=model, messages=messages, temperature=temperature, timeout=timeout
+            )
+        except Exception as e:
+            raise self._translate(e) from e
+        usage = getattr(completion, "usage", None)
+        usage = {
+            "prompt_tokens": getattr(usage, "prompt_tokens", None),
+            "completion_tokens": getattr(usage, "completion_tokens", None),
+        }
+        return completion.choices[0].message.content.strip(), usage
+
+    def stream(self, model, messages, temperature, timeout):
+        try:
+            stream = self.client.chat.completions.create(
+                model=model, messages=messages, temperature=temperature,
+                timeout=timeout, stream=True
+            )
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    yield delta
+        except Exception as e:
+            raise self._translate(e) from e
+
+    def warm(self):
+        self.client.models.list()
+
+
+class LocalBackend(LLMBackend):
+    """Offline stand-in that answers the app's three prompt types.
+
+    Question-set prompts get a valid 15-question JSON set, report prompts a
+    summary plus the three bullet lists, anything else a short chat reply.
+    LOCAL_LLM_LATENCY (seconds) simulates provider latency.
+    """
+
+    name = "local"
+    TRAITS = ["Openness", "Conscientiousness", "Extraversion", "Agreeableness", "Neuroticism"]
+    QUESTIONS = [
+        "I enjoy trying foods I have never eaten before.",
+        "I like to have my week planned out in advance.",
+        "I feel energized after spending time with a big group.",
+        "I go out of my way to help people who are struggling.",
+        "I often worry about things that might go wrong.",
+        "I get lost in thought about art, music or big ideas.",
+        "I finish tasks before I let myself relax.",
+        "I am usually the one who starts conversations.",
+        "I find it easy to forgive people who upset me.",
+        "Small setbacks can ruin my mood for the whole day.",
+        "I like exploring places I have never been to.",
+        "I keep my living space tidy and organized.",
+        "I would rather spend a Friday night out than at home.",
+        "I trust that most people have good intentions.",
+        "I get nervous before important events.",
+    ]
+
+    def __init__(self, latency=None):
+        self.latency = float(os.environ.get("LOCAL_LLM_LATENCY", "0") if latency is None else latency)
+
+    def _reply(self, messages):
+        prompt = messages[-1]["content"]
+        if "trait_mapping" in prompt:
+            return json.dumps({
+                "questions": self.QUESTIONS,
+                "trait_mapping": [
+                    {"index": i, "traits": [self.TRAITS[i % 5]]} for i in range(len(self.QUESTIONS))
+                ],
+            })
+        if "Big Five scores" in prompt:
+            return (
+                "You are a thoughtful person who balances curiosity with a steady sense of "
+                "responsibility. You enjoy meaningful conversations and tend to think before you act. "
+                "People see you as dependable and kind.\n\n"
+                "Here are your strengths:\n"
+                "- You adapt quickly to new situations.\n"
+                "- You follow through on commitments.\n"
+                "- You listen carefully to others.\n"
+                "- You stay calm when plans change.\n\n"
+                "Some areas where you can grow:\n"
+                "- Sharing your opinions more openly.\n"
+                "- Letting go of small mistakes.\n"
+                "- Asking for help earlier.\n"
+                "- Taking time to rest.\n\n"
+                "Here are some recommendations:\n"
+                "- Try speaking first in one meeting each week.\n"
+                "- Keep a short journal of what went well each day.\n"
+                "- Schedule one unplanned afternoon a month.\n"
+                "- Reach out to a friend when you feel stuck."
+            )
+        match = re.search(r"QUESTION:\s*(.+)", prompt)
+        question = match.group(1).strip() if match else "your question"
+        return (
+            f"Thanks for asking \"{question}\". Based on your profile:\n"
+            "- You bring curiosity and care to the people around you.\n"
+            "- Small, regular habits will help you grow the most."
+        )
+
+    def complete(self, model, messages, temperature, timeout):
+        if self.latency:
+            time.sleep(min(self.latency, timeout))
+        text = self._reply(messages)
+        return text, {"prompt_tokens": None, "completion_tokens": None}
+
+    def stream(self, model, messages, temperature, timeout):
+        if self.latency:
+            time.sleep(min(self.latency, timeout))
+        for piece in re.findall(r"\S+\s*|\s+", self._reply(messages)):
+            yield piece
+
+
+BACKENDS = {"groq": GroqBackend, "local": LocalBackend}
+
+
+def approx_tokens(text):
+    """Rough token count (~4 characters per token) for unreported usage."""
+    return max(1, len(text) // 4) if text else 0
+
+
+def _record_usage(backend, messages, completion_tokens, usage=None):
+    usage = usage or {}
+    prompt_tokens = usage.get("prompt_tokens")
+    if prompt_tokens is None:
+        prompt_tokens = sum(approx_tokens(m.get("content", "")) for m in messages)
+    if usage.get("completion_tokens") is not None:
+        completion_tokens = usage["completion_tokens"]
+    metrics.inc("llm_calls_total", backend=backend)
+    metrics.inc("llm_prompt_tokens_total", prompt_tokens, backend=backend)
+    metrics.inc("llm_completion_tokens_total", completion_tokens, backend=backend)
+
+
+# ================================
+# RATE LIMITING
+# ================================
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, up to `capacity`."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout=None):
+        """Take one token, waiting if needed. Returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate if self.rate > 0 else 0.1
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+    def drain(self, seconds):
+        """Push the bucket into debt, e.g. after the provider says Retry-After."""
+        with self._lock:
+            self._tokens = min(self._tokens, 0.0) - seconds * self.rate
+
+
+# ================================
+# GATEWAY
+# ================================
+class LLMGateway:
+    def __init__(self, backend, rate=LLM_RATE_PER_SEC, burst=LLM_BURST,
+                 max_concurrency=LLM_MAX_CONCURRENCY, timeout=LLM_TIMEOUT,
+                 max_retries=LLM_MAX_RETRIES):
+        self.backend = backend
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self._bucket = TokenBucket(rate, burst)
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+        self.stats = {"requests": 0, "coalesced": 0, "retries": 0, "failures": 0}
+
+    def _admit(self):
+        if not self._bucket.acquire(timeout=self.timeout):
+            raise TimeoutError("LLM rate limiter queue wait exceeded the request timeout")
+        if not self._slots.acquire(timeout=self.timeout):
+            raise TimeoutError("no free LLM concurrency slot within the request timeout")
+
+    def _backoff(self, attempt, error):
+        # full jitter, capped; honour the provider's Retry-After if given
+        delay = random.uniform(0, min(30.0, 0.5 * 2 ** attempt))
+        if getattr(error, "retry_after", None):
+            delay = max(delay, error.retry_after)
+            self._bucket.drain(error.retry_after)
+        self.stats["retries"] += 1
+        time.sleep(delay)
+
+    def _call(self, model, messages, temperature):
+        attempt = 0
+        while True:
+            self._admit()
+            try:
+                self.stats["requests"] += 1
+                text, usage = self.backend.complete(model, messages, temperature, self.timeout)
+                _record_usage(self.backend.name, messages, approx_tokens(text), usage)
+                return text, usage
+            except RetryableError as e:
+                if attempt >= self.max_retries:
+                    self.stats["failures"] += 1
+                    raise
+                error = e
+            finally:
+                self._slots.release()
+            self._backoff(attempt, error)
+            attempt += 1
+
+    def complete(self, model, messages, temperature=0.3):
+        """Blocking completion; identical concurrent requests share one call."""
+        key = hashlib.sha256(
+            json.dumps([model, messages, temperature], sort_keys=True).encode("utf-8")
+        ).hexdigest()
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+            else:
+                self.stats["coalesced"] += 1
+
+        if not leader:
+            return future.result()[0]
+
+        try:
+            result = self._call(model, messages, temperature)
+            future.set_result(result)
+            return result[0]
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+
+    def stream(self, model, messages, temperature=0.3):
+        """Yield completion deltas. Retries only before the first token."""
+        attempt = 0
+        while True:
+            self._admit()
+            started = False
+            deltas = 0
+            try:
+                self.stats["requests"] += 1
+                for delta in self.backend.stream(model, messages, temperature, self.timeout):
+                    started = True
+                    # providers send roughly one token per delta
+                    deltas += 1
+                    yield delta
+                _record_usage(self.backend.name, messages, deltas)
+                return
+            except RetryableError as e:
+                if started or attempt >= self.max_retries:
+                    self.stats["failures"] += 1
+                    raise
+                error = e
+            finally:
+                self._slots.release()
+            self._backoff(attempt, error)
+            attempt += 1
+
+    def warm(self):
+        try:
+            self.backend.warm()
+        except Exception as e:
+            print("LLM warm-up failed:", e)
+
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+
+def get_gateway():
+    """Process-wide gateway for the backend named by LLM_BACKEND."""
+    global _gateway
+    with _gateway_lock:
+        if _gateway is None:
+            if LLM_BACKEND not in BACKENDS:
+                raise ValueError(f"Unknown LLM_BACKEND {LLM_BACKEND!r}; expected one of {sorted(BACKENDS)}")
+            _gateway = LLMGateway(BACKENDS[LLM_BACKEND]())
+        return _gateway
@@ -0,0 +1,238 @@
+# metrics.py
+# ================================
+# LIGHTWEIGHT METRICS AND TRACING
+# ================================
+# Process-wide counters, gauges and latency histograms, cheap enough to
+# leave on all the time: one perf_counter() pair and a dict update under a
+# lock per span. Exported two ways:
+#   - Prometheus text format on http://METRICS_HOST:METRICS_PORT/metrics
+#     (loopback only unless METRICS_HOST says otherwise; no authentication)
+#   - a periodic JSON snapshot per line in METRICS_JSONL, size-rotated
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METRICS_HOST = os.environ.get("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.environ.get("METRICS_PORT", "9464"))  # 0 disables the endpoint
+METRICS_JSONL = os.environ.get("METRICS_JSONL", os.path.join("data", "metrics", "metrics.jsonl"))
+METRICS_INTERVAL = float(os.environ.get("METRICS_INTERVAL", "15"))
+METRICS_JSONL_MAX_BYTES = int(os.environ.get("METRICS_JSONL_MAX_MB", "10")) * 1024 * 1024
+METRICS_JSONL_BACKUPS = int(os.environ.get("METRICS_JSONL_BACKUPS", "5"))
+SESSION_IDLE_SECONDS = 300
+
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_lock = threading.Lock()
+_counters = {}
+_gauges = {}
+_histograms = {}   # key -> [bucket counts..., +Inf count], sum
+_sessions = {}     # session id -> last seen (monotonic)
+_collectors = []   # (prefix, fn) polled at export time
+_started = False
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def inc(name, value=1, **labels):
+    k = _key(name, labels)
+    with _lock:
+        _counters[k] = _counters.get(k, 0) + value
+
+
+def set_gauge(name, value, **labels):
+    with _lock:
+        _gauges[_key(name, labels)] = value
+
+
+def observe(name, value, **labels):
+    k = _key(name, labels)
+    with _lock:
+        h = _histograms.get(k)
+        if h is None:
+            h = _histograms[k] = [[0] * (len(BUCKETS) + 1), 0.0]
+        counts = h[0]
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                counts[i] += 1
+                break
+        else:
+            counts[-1] += 1
+        h[1] += value
+
+
+@contextmanager
+def span(name, **labels):
+    """Time a block into the span_seconds{span=name} histogram."""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        inc("span_errors_total", span=name, **labels)
+        raise
+    finally:
+        observe("span_seconds", time.perf_counter() - start, span=name, **labels)
+
+
+def touch_session(session_id):
+    """Mark a UI session as active; feeds the sessions_active gauge."""
+    now = time.monotonic()
+    with _lock:
+        if session_id not in _sessions:
+            _counters[_key("sessions_started_total", {})] = _counters.get(_key("sessions_started_total", {}), 0) + 1
+        _sessions[session_id] = now
+
+
+def register_collector(prefix, fn):
+    """Poll fn() -> {key: number} at export time as <prefix>_<key> gauges.
+
+    For values that already live elsewhere (store sizes, cache stats), so
+    the hot path pays nothing for them.
+    """
+    with _lock:
+        _collectors.append((prefix, fn))
+
+
+def _collect():
+    with _lock:
+        collectors = list(_collectors)
+    for prefix, fn in collectors:
+        try:
+            values = fn()
+        except Exception as e:
+            print(f"[metrics] collector {prefix} failed:", e)
+            continue
+        for key, value in values.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                set_gauge(f"{prefix}_{key}", value)
+
+
+def _session_gauges():
+    cutoff = time.monotonic() - SESSION_IDLE_SECONDS
+    with _lock:
+        for sid in [s for s, seen in _sessions.items() if seen < cutoff]:
+            del _sessions[sid]
+        _gauges[_key("sessions_active", {})] = len(_sessions)
+
+
+# ================================
+# EXPORT
+# ================================
+def snapshot():
+    """All current values as plain JSON-serialisable data."""
+    _collect()
+    _session_gauges()
+    with _lock:
+        def fmt(k):
+            return {"name": k[0], "labels": dict(k[1])}
+        return {
+            "ts": time.time(),
+            "counters": [dict(fmt(k), value=v) for k, v in _counters.items()],
+            "gauges": [dict(fmt(k), value=v) for k, v in _gauges.items()],
+            "histograms": [
+                dict(fmt(k), buckets=list(h[0]), sum=h[1], count=sum(h[0]))
+                for k, h in _histograms.items()
+            ],
+        }
+
+
+def _labels_text(labels, extra=None):
+    items = list(labels.items()) + (list(extra.items()) if extra else [])
+    if not items:
+        return ""
+    body = ",".join(f'{k}="{str(v)}"'.replace("\n", " ") for k, v in items)
+    return "{" + body + "}"
+
+
+def render_prometheus():
+    """Prometheus text exposition (version 0.0.4)."""
+    snap = snapshot()
+    lines = []
+    typed = set()
+
+    def type_line(name, kind):
+        if name not in typed:
+            typed.add(name)
+            lines.append(f"# TYPE {name} {kind}")
+
+    for c in snap["counters"]:
+        type_line(c["name"], "counter")
+        lines.append(f"{c['name']}{_labels_text(c['labels'])} {c['value']}")
+    for g in snap["gauges"]:
+        type_line(g["name"], "gauge")
+        lines.append(f"{g['name']}{_labels_text(g['labels'])} {g['value']}")
+    for h in snap["histograms"]:
+        name = h["name"]
+        type_line(name, "histogram")
+        cumulative = 0
+        for bound, count in zip(BUCKETS + ("+Inf",), h["buckets"]):
+            cumulative += count
+            lines.append(f"{name}_bucket{_labels_text(h['labels'], {'le': bound})} {cumulative}")
+        lines.append(f"{name}_sum{_labels_text(h['labels'])} {h['sum']}")
+        lines.append(f"{name}_count{_labels_text(h['labels'])} {h['count']}")
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_response(404)
+            self.end_headers()
+            return
+        body = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def _rotate(path, backups):
+    for i in range(backups - 1, 0, -1):
+        if os.path.exists(f"{path}.{i}"):
+            os.replace(f"{path}.{i}", f"{path}.{i + 1}")
+    os.replace(path, f"{path}.1")
+
+
+def write_jsonl(path=METRICS_JSONL, max_bytes=METRICS_JSONL_MAX_BYTES, backups=METRICS_JSONL_BACKUPS):
+    """Append one snapshot line, rotating path -> path.1 -> ... when full."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    if os.path.exists(path) and os.path.getsize(path) >= max_bytes:
+        _rotate(path, backups)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(snapshot()) + "\n")
+
+
+def start_exporters(host=METRICS_HOST, port=METRICS_PORT, jsonl_path=METRICS_JSONL, interval=METRICS_INTERVAL):
+    """Start the /metrics endpoint and the JSONL writer once per process."""
+    global _started
+    with _lock:
+        if _started:
+            return
+        _started = True
+
+    if port:
+        try:
+            server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            server.daemon_threads = True
+            threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        except OSError as e:
+            # e.g. a second worker on the same host; JSONL export still runs
+            print(f"[metrics] could not bind {host}:{port}:", e)
+
+    if jsonl_path:
+        def _loop():
+            while True:
+                time.sleep(interval)
+                try:
+                    write_jsonl(jsonl_path)
+                except OSError as e:
+                    print("[metrics] JSONL export failed:", e)
+        threading.Thread(target=_loop, name="metrics-jsonl", daemon=True).start()
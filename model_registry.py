@@ -0,0 +1,167 @@
+# model_registry.py
+# ================================
+# PROCESS-WIDE MODEL REGISTRY
+# ================================
+# Streamlit re-executes app.py on every rerun and keeps one script run per
+# browser session, but imported modules live once per server process. Models
+# registered here are therefore loaded a single time and shared by every
+# session and rerun.
+import os
+import re
+import threading
+import time
+
+EMBED_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+EMBED_DIMENSION = 384
+EMBED_BACKEND = os.environ.get("EMBED_BACKEND", "torch")   # torch | onnx (see onnx_embedder.py)
+
+_lock = threading.Lock()
+_models = {}
+_loading = {}
+_stats = {}
+
+
+def _rss_bytes():
+    """Current resident set size of this process (0 if unknown)."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        # ru_maxrss is a high-water mark (KB on Linux), good enough as fallback
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    except (ImportError, AttributeError):
+        return 0
+
+
+def _load_sentence_transformer(name):
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(name)
+
+
+def _load_onnx_embedder(name):
+    from onnx_embedder import load_onnx_embedder
+    return load_onnx_embedder(name.split("@")[0])
+
+
+_EMBED_LOADERS = {"torch": _load_sentence_transformer, "onnx": _load_onnx_embedder}
+
+
+def _embed_key():
+    """Registry name of the configured embedding backend."""
+    if EMBED_BACKEND not in _EMBED_LOADERS:
+        raise ValueError(f"Unknown EMBED_BACKEND {EMBED_BACKEND!r}; expected torch or onnx")
+    return EMBED_MODEL_NAME if EMBED_BACKEND == "torch" else f"{EMBED_MODEL_NAME}@{EMBED_BACKEND}"
+
+
+def _load(name, loader):
+    rss_before = _rss_bytes()
+    start = time.perf_counter()
+    model = loader(name)
+    elapsed = time.perf_counter() - start
+    rss_after = _rss_bytes()
+
+    stats = {
+        "name": name,
+        "load_seconds": round(elapsed, 3),
+        "rss_delta_mb": round((rss_after - rss_before) / (1024 * 1024), 1),
+        "rss_total_mb": round(rss_after / (1024 * 1024), 1),
+    }
+    print(
+        f"[model_registry] loaded {name} in {stats['load_seconds']}s "
+        f"(+{stats['rss_delta_mb']} MB, rss {stats['rss_total_mb']} MB)"
+    )
+    return model, stats
+
+
+def get_model(name, loader=_load_sentence_transformer):
+    """Return the shared model `name`, loading it on first use.
+
+    Concurrent callers block on the same load instead of each building
+    their own copy.
+    """
+    model = _models.get(name)
+    if model is not None:
+        return model
+
+    with _lock:
+        model = _models.get(name)
+        if model is not None:
+            return model
+        event = _loading.get(name)
+        owner = event is None
+        if owner:
+            event = threading.Event()
+            _loading[name] = event
+
+    if not owner:
+        event.wait()
+        model = _models.get(name)
+        if model is None:
+            # the owning thread failed; try again ourselves
+            return get_model(name, loader)
+        return model
+
+    try:
+        model, stats = _load(name, loader)
+        with _lock:
+            _models[name] = model
+            _stats[name] = stats
+        return model
+    finally:
+        with _lock:
+            _loading.pop(name, None)
+        event.set()
+
+
+def get_embed_model():
+    """Shared embedding model used by store_in_faiss and rag_chat.
+
+    A SentenceTransformer, or with EMBED_BACKEND=onnx a batched ONNX
+    embedder; both have encode(texts).
+    """
+    return get_model(_embed_key(), _EMBED_LOADERS[EMBED_BACKEND])
+
+
+def embed_stats():
+    """Batching counters of the embedding model, if it is loaded and has any."""
+    return dict(getattr(_models.get(_embed_key()), "stats", {}))
+
+
+def warm_up(name=None, loader=None):
+    """Start loading `name` (default: the embedding model) in a background thread.
+
+    Idempotent. Returns immediately; the first real caller of get_model()
+    waits only for whatever part of the load is still outstanding.
+    """
+    if name is None:
+        name, loader = _embed_key(), _EMBED_LOADERS[EMBED_BACKEND]
+    loader = loader or _load_sentence_transformer
+    with _lock:
+        if name in _models or name in _loading:
+            return
+
+    def _run():
+        try:
+            get_model(name, loader)
+        except Exception as e:
+            print(f"[model_registry] warm-up of {name} failed:", e)
+
+    threading.Thread(target=_run, name=f"warmup-{name}", daemon=True).start()
+
+
+def model_stats():
+    """Load time and memory of every model loaded so far, as flat numeric keys.
+
+    e.g. {"all_minilm_l6_v2_load_seconds": 2.1, ...}; a metrics collector.
+    """
+    out = {}
+    with _lock:
+        for name, stats in _stats.items():
+            slug = re.sub(r"[^a-z0-9]+", "_", name.split("/")[-1].lower()).strip("_")
+            for key in ("load_seconds", "rss_delta_mb", "rss_total_mb"):
+                out[f"{slug}_{key}"] = stats[key]
+    return out
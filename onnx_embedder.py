@@ -0,0 +1,223 @@
+# onnx_embedder.py
+# ================================
+# ONNX / INT8 EMBEDDING BACKEND
+# ================================
+# An optional CPU-only replacement for SentenceTransformer.encode, selected
+# with EMBED_BACKEND=onnx (see model_registry.py). It keeps the same
+# interface, encode(texts) -> (n, 384) float32 unit vectors, so
+# store_in_faiss and rag_chat are unchanged.
+#
+#   - MiniLM is exported once to ONNX and its weights dynamically quantized
+#     to int8 (activations stay float, scaled per batch)
+#   - onnxruntime runs it with EMBED_THREADS intra-op threads and no
+#     idle spinning, because it shares the CPU with the app
+#   - texts in a call are sorted by length before batching, so padding stays
+#     short
+#   - a MicroBatcher merges concurrent encode() calls from different
+#     sessions into one model run
+#
+# The export needs torch and transformers (both come with
+# sentence-transformers). Serving needs only onnxruntime and tokenizers.
+#
+#   python onnx_embedder.py export            # writes EMBED_ONNX_DIR
+#   python -m benchmarks.embed_bench          # speed + cosine fidelity vs torch
+import argparse
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+EMBED_ONNX_DIR = os.environ.get("EMBED_ONNX_DIR", os.path.join("data", "models", "all-MiniLM-L6-v2-onnx"))
+EMBED_ONNX_PRECISION = os.environ.get("EMBED_ONNX_PRECISION", "int8")   # int8 | fp32
+EMBED_THREADS = int(os.environ.get("EMBED_THREADS", "0"))   # 0 = about one per physical core
+EMBED_BATCH_SIZE = int(os.environ.get("EMBED_BATCH_SIZE", "32"))
+EMBED_MAX_BATCH = int(os.environ.get("EMBED_MAX_BATCH", "64"))
+EMBED_BATCH_WAIT_MS = float(os.environ.get("EMBED_BATCH_WAIT_MS", "0"))
+EMBED_MAX_TOKENS = 256   # max_seq_length of all-MiniLM-L6-v2 in sentence-transformers
+
+MODEL_FILES = {"fp32": "model.onnx", "int8": "model-int8.onnx"}
+
+
+def default_threads():
+    # logical CPUs / 2 approximates physical cores; hyperthreads add little here
+    return max(1, (os.cpu_count() or 2) // 2)
+
+
+# ================================
+# EXPORT
+# ================================
+def export_onnx(model_name, directory=EMBED_ONNX_DIR, quantize=True):
+    """Export the SentenceTransformer's encoder (and tokenizer) to `directory`."""
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    os.makedirs(directory, exist_ok=True)
+    st_model = SentenceTransformer(model_name, device="cpu")
+    encoder = st_model[0].auto_model.eval()
+    tokenizer = st_model[0].tokenizer
+    tokenizer.save_pretrained(directory)
+
+    sample = tokenizer(["an example sentence", "another one"], padding=True, return_tensors="pt")
+    names = [n for n in ("input_ids", "attention_mask", "token_type_ids") if n in sample]
+    axes = {n: {0: "batch", 1: "sequence"} for n in names}
+    axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+    fp32_path = os.path.join(directory, MODEL_FILES["fp32"])
+    with torch.no_grad():
+        torch.onnx.export(
+            encoder, tuple(sample[n] for n in names), fp32_path,
+            input_names=names, output_names=["last_hidden_state"],
+            dynamic_axes=axes, opset_version=14, do_constant_folding=True
+        )
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantize_dynamic(fp32_path, os.path.join(directory, MODEL_FILES["int8"]), weight_type=QuantType.QInt8)
+
+    with open(os.path.join(directory, "export.json"), "w", encoding="utf-8") as f:
+        json.dump({"model": model_name, "max_tokens": EMBED_MAX_TOKENS,
+                   "dimension": st_model.get_sentence_embedding_dimension(),
+                   "exported": time.time()}, f, indent=2)
+    print(f"[onnx_embedder] exported {model_name} to {directory}")
+    return directory
+
+
+# ================================
+# INFERENCE
+# ================================
+class OnnxEmbedder:
+    """Mean-pooled, L2-normalized sentence embeddings from an exported encoder."""
+
+    def __init__(self, directory=EMBED_ONNX_DIR, precision=EMBED_ONNX_PRECISION,
+                 threads=EMBED_THREADS, batch_size=EMBED_BATCH_SIZE):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        self.path = os.path.join(directory, MODEL_FILES[precision])
+        self.batch_size = batch_size
+        self.threads = threads or default_threads()
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.intra_op_num_threads = self.threads
+        options.inter_op_num_threads = 1
+        # spinning workers would burn the cores between requests
+        options.add_session_config_entry("session.intra_op.allow_spinning", "0")
+        self.session = ort.InferenceSession(self.path, options, providers=["CPUExecutionProvider"])
+        self._inputs = {i.name for i in self.session.get_inputs()}
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(directory, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=EMBED_MAX_TOKENS)
+        self.tokenizer.enable_padding(pad_id=self.tokenizer.token_to_id("[PAD]") or 0, pad_token="[PAD]")
+
+    def _run(self, texts):
+        encodings = self.tokenizer.encode_batch(texts)
+        mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feed = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": mask,
+            "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+        }
+        hidden = self.session.run(None, {k: v for k, v in feed.items() if k in self._inputs})[0]
+        weights = mask[:, :, None].astype(np.float32)
+        pooled = (hidden * weights).sum(axis=1) / np.maximum(weights.sum(axis=1), 1e-9)
+        return pooled / np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+
+    def encode(self, texts, batch_size=None):
+        single = isinstance(texts, str)
+        texts = [texts] if single else list(texts)
+        out = np.empty((len(texts), 0), dtype=np.float32)
+        if texts:
+            batch_size = batch_size or self.batch_size
+            order = np.argsort([len(t) for t in texts], kind="stable")
+            parts = [self._run([texts[i] for i in order[s:s + batch_size]])
+                     for s in range(0, len(texts), batch_size)]
+            out = np.empty((len(texts), parts[0].shape[1]), dtype=np.float32)
+            out[order] = np.concatenate(parts)
+        return out[0] if single else out
+
+
+class MicroBatcher:
+    """Runs concurrent encode() calls as one batched call on a worker thread.
+
+    Calls that arrive while a batch is encoding are merged into the next
+    one (up to max_batch texts). With max_wait > 0 the worker also holds a
+    lone request that long to collect company.
+    """
+
+    def __init__(self, model, max_batch=EMBED_MAX_BATCH, max_wait=EMBED_BATCH_WAIT_MS / 1000):
+        self.model = model
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.stats = {"calls": 0, "batches": 0, "texts": 0, "largest_batch": 0}
+        self._queue = queue.Queue()
+        threading.Thread(target=self._worker, name="embed-batcher", daemon=True).start()
+
+    def encode(self, texts, **kwargs):
+        single = isinstance(texts, str)
+        texts = [texts] if single else list(texts)
+        future = Future()
+        self._queue.put((texts, future))
+        vectors = future.result()
+        return vectors[0] if single else vectors
+
+    def _collect(self):
+        jobs = [self._queue.get()]
+        count = len(jobs[0][0])
+        deadline = time.monotonic() + self.max_wait
+        while count < self.max_batch:
+            try:
+                wait = deadline - time.monotonic()
+                job = self._queue.get(timeout=wait) if wait > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            jobs.append(job)
+            count += len(job[0])
+        return jobs, count
+
+    def _worker(self):
+        while True:
+            jobs, count = self._collect()
+            try:
+                vectors = self.model.encode([t for texts, _ in jobs for t in texts])
+            except Exception as e:
+                for _, future in jobs:
+                    future.set_exception(e)
+                continue
+            self.stats["calls"] += len(jobs)
+            self.stats["batches"] += 1
+            self.stats["texts"] += count
+            self.stats["largest_batch"] = max(self.stats["largest_batch"], count)
+            offset = 0
+            for texts, future in jobs:
+                future.set_result(vectors[offset:offset + len(texts)])
+                offset += len(texts)
+
+
+def load_onnx_embedder(model_name, directory=EMBED_ONNX_DIR, precision=EMBED_ONNX_PRECISION):
+    """Batched ONNX embedder for `model_name`, exporting it on first use."""
+    if not os.path.exists(os.path.join(directory, MODEL_FILES[precision])):
+        export_onnx(model_name, directory, quantize=precision == "int8")
+    return MicroBatcher(OnnxEmbedder(directory, precision))
+
+
+def main(argv=None):
+    from model_registry import EMBED_MODEL_NAME
+
+    parser = argparse.ArgumentParser(description="Export the embedding model to ONNX (+ int8).")
+    parser.add_argument("command", choices=["export"])
+    parser.add_argument("--model", default=EMBED_MODEL_NAME)
+    parser.add_argument("--output", default=EMBED_ONNX_DIR)
+    parser.add_argument("--no-quantize", action="store_true", help="only write the fp32 model")
+    args = parser.parse_args(argv)
+    export_onnx(args.model, args.output, quantize=not args.no_quantize)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,238 @@
+# question_parser.py
+# ================================
+# STREAMING QUESTION-SET PARSER
+# ================================
+# Parses the LLM's `questions`/`trait_mapping` JSON while it streams, one
+# array item at a time. Each item is validated as soon as it closes:
+#   - questions can be shown while the rest is still generating
+#   - a truncated or partly malformed reply keeps every good item
+#   - a retry asks only for the missing or broken items (repair_prompt)
+# Anything before the first "{" (code fences, chatter) is ignored.
+import json
+
+from question_pool import ALLOWED_TRAITS, QUESTIONS_PER_SET
+
+
+class QuestionSetError(ValueError):
+    """The set is still incomplete after repairs; `partial` holds what was salvaged."""
+
+    def __init__(self, message, partial):
+        super().__init__(message)
+        self.partial = partial
+
+
+class _Frame:
+    __slots__ = ("kind", "key", "expect_key", "items", "start")
+
+    def __init__(self, kind, start):
+        self.kind = kind          # "{" or "["
+        self.key = None           # current key (objects)
+        self.expect_key = True    # next string is a key (objects)
+        self.items = 0            # commas seen = position of the current item (arrays)
+        self.start = start        # buffer offset of the opening bracket
+
+
+class QuestionSetParser:
+    """Incremental parser for one question set.
+
+    `slots` are the question indexes this reply is allowed to fill. None
+    means positional: the n-th string in "questions" is question n. Repair
+    replies fill only the slots they were asked for, either positionally in
+    that order or via {"index": i, "question": "..."} items.
+    """
+
+    def __init__(self, on_question=None, slots=None, size=QUESTIONS_PER_SET):
+        self.size = size
+        self.on_question = on_question
+        self.slots = list(range(size)) if slots is None else list(slots)
+        self.questions = [None] * size
+        self.mapping = {}
+        self.rejected = []   # human-readable reasons, for logs and repair prompts
+        self._buf = []
+        self._pos = 0
+        self._stack = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._closed = False
+
+    # ---------- incremental scanning ----------
+    def feed(self, text):
+        for ch in text:
+            self._buf.append(ch)
+            self._step(ch, self._pos)
+            self._pos += 1
+
+    def _raw(self, start, end):
+        return "".join(self._buf[start:end + 1])
+
+    def _step(self, ch, pos):
+        if self._closed:
+            return
+        if self._in_string:
+            if self._escape:
+                self._escape = False
+            elif ch == "\\":
+                self._escape = True
+            elif ch == '"':
+                self._in_string = False
+                self._string_done(self._raw(self._string_start, pos))
+            return
+        if not self._stack and ch != "{":
+            return  # preamble before the top-level object
+
+        if ch == '"':
+            self._in_string = True
+            self._string_start = pos
+        elif ch in "{[":
+            self._stack.append(_Frame(ch, pos))
+        elif ch in "}]":
+            if not self._stack:
+                return
+            frame = self._stack.pop()
+            if not self._stack:
+                self._closed = True
+            elif len(self._stack) == 2 and frame.kind == "{":
+                self._item_done(self._raw(frame.start, pos))
+        elif ch == ":" and self._stack[-1].kind == "{":
+            self._stack[-1].expect_key = False
+        elif ch == ",":
+            if self._stack[-1].kind == "{":
+                self._stack[-1].expect_key = True
+            else:
+                self._stack[-1].items += 1
+
+    def _section(self):
+        """Top-level key of the array the current item belongs to, if any."""
+        if len(self._stack) == 2 and self._stack[1].kind == "[":
+            return self._stack[0].key
+        return None
+
+    def _string_done(self, raw):
+        try:
+            value = json.loads(raw)
+        except ValueError:
+            value = None
+        top = self._stack[-1]
+        if top.kind == "{" and top.expect_key:
+            top.key = value
+            return
+        if len(self._stack) == 2 and self._section() == "questions":
+            self._add_question(self._positional_slot(top.items), value)
+
+    def _item_done(self, raw):
+        section = self._section()
+        if section not in ("questions", "trait_mapping"):
+            return
+        try:
+            item = json.loads(raw)
+        except ValueError:
+            self.rejected.append(f"unparseable {section} item")
+            return
+        if section == "questions":
+            slot = item.get("index") if "index" in item else self._positional_slot(self._stack[1].items)
+            self._add_question(slot, item.get("question"))
+        elif section == "trait_mapping":
+            self._add_mapping(item)
+
+    # ---------- validation ----------
+    def _positional_slot(self, n):
+        return self.slots[n] if n < len(self.slots) else None
+
+    def _add_question(self, slot, text):
+        if not isinstance(slot, int) or slot not in self.slots:
+            self.rejected.append(f"question for unexpected index {slot!r}")
+            return
+        if not isinstance(text, str) or not text.strip():
+            self.rejected.append(f"question {slot} is empty or not a string")
+            return
+        text = text.strip()
+        if self.questions[slot] is not None:
+            return
+        if text.lower() in {q.lower() for q in self.questions if q}:
+            self.rejected.append(f"question {slot} is a duplicate")
+            return
+        self.questions[slot] = text
+        if self.on_question is not None:
+            self.on_question(slot, text)
+
+    def _add_mapping(self, item):
+        idx, traits = item.get("index"), item.get("traits")
+        if not isinstance(idx, int) or not 0 <= idx < self.size:
+            self.rejected.append(f"trait_mapping index {idx!r} out of range")
+            return
+        if not isinstance(traits, list) or not traits or not set(traits) <= ALLOWED_TRAITS:
+            self.rejected.append(f"trait_mapping for question {idx} has invalid traits")
+            return
+        self.mapping.setdefault(idx, traits)
+
+    # ---------- results ----------
+    def missing_questions(self):
+        return [i for i, q in enumerate(self.questions) if q is None]
+
+    def unmapped(self):
+        return [i for i in range(self.size) if i not in self.mapping]
+
+    def complete(self):
+        return not self.missing_questions() and not self.unmapped()
+
+    def merge(self, other):
+        """Take the items a repair reply produced for our open slots."""
+        for i in other.slots:
+            if other.questions[i] is not None:
+                self._add_question(i, other.questions[i])
+        for idx, traits in other.mapping.items():
+            if idx in other.slots:
+                # a re-asked question replaces whatever mapping its broken predecessor had
+                self.mapping[idx] = traits
+            else:
+                self.mapping.setdefault(idx, traits)
+        self.rejected.extend(other.rejected)
+
+    def result(self):
+        """The set in the usual schema; only meaningful once complete()."""
+        return {
+            "questions": list(self.questions),
+            "trait_mapping": [{"index": i, "traits": self.mapping[i]} for i in sorted(self.mapping)],
+        }
+
+    def salvage(self):
+        """Valid questions only, re-indexed, with the mappings that still apply."""
+        kept = [i for i, q in enumerate(self.questions) if q is not None]
+        return {
+            "questions": [self.questions[i] for i in kept],
+            "trait_mapping": [
+                {"index": new, "traits": self.mapping[old]}
+                for new, old in enumerate(kept) if old in self.mapping
+            ],
+        }
+
+
+def repair_prompt(parser):
+    """Prompt for just the missing questions and mappings of `parser`'s set."""
+    missing = parser.missing_questions()
+    unmapped = [i for i in parser.unmapped() if i not in missing]
+    existing = "\n".join(f"{i}: {q}" for i, q in enumerate(parser.questions) if q is not None)
+    return f"""
+You are completing a Big Five personality assessment (TIPI style). These questions already exist:
+
+{existing or "(none)"}
+
+Write ONLY what is missing:
+- New questions for indexes {missing}: natural, conversational full sentences that do not repeat the existing ones and do not mention the traits.
+- A trait_mapping entry for every index in {sorted(missing + unmapped)}.
+
+Allowed trait names:
+Extraversion, Agreeableness, Conscientiousness, Neuroticism, Openness
+
+Output JSON ONLY as:
+{{
+  "questions": [
+     {{"index": <index>, "question": "..."}}
+  ],
+  "trait_mapping": [
+     {{"index": <index>, "traits": ["Openness"]}}
+  ]
+}}
+No extra text, no markdown.
+"""
@@ -0,0 +1,223 @@
+# question_pool.py
+# ================================
+# PRE-GENERATED QUESTION-SET POOL
+# ================================
+# Question sets are generated ahead of time by a background refiller and
+# kept on disk, so "Start Personality Test" is a local lookup instead of a
+# blocking LLM round-trip. The LLM is only called when the pool runs low.
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+
+ALLOWED_TRAITS = {"Extraversion", "Agreeableness", "Conscientiousness", "Neuroticism", "Openness"}
+QUESTIONS_PER_SET = 15
+
+POOL_DIR = os.environ.get("QUESTION_POOL_DIR", os.path.join("data", "question_pool"))
+POOL_TARGET = int(os.environ.get("QUESTION_POOL_TARGET", "8"))
+POOL_LOW_WATER = int(os.environ.get("QUESTION_POOL_LOW_WATER", "3"))
+POOL_MAX_AGE = float(os.environ.get("QUESTION_POOL_MAX_AGE_HOURS", "168")) * 3600
+POOL_MAX_SERVES = int(os.environ.get("QUESTION_POOL_MAX_SERVES", "50"))
+
+
+def validate_question_set(data):
+    """Return a list of schema problems for a `questions`/`trait_mapping` dict.
+
+    An empty list means the set is usable as-is.
+    """
+    if not isinstance(data, dict):
+        return ["top level is not an object"]
+
+    problems = []
+    questions = data.get("questions")
+    if not isinstance(questions, list):
+        return ["'questions' is not a list"]
+    if len(questions) != QUESTIONS_PER_SET:
+        problems.append(f"expected {QUESTIONS_PER_SET} questions, got {len(questions)}")
+    seen = set()
+    for i, q in enumerate(questions):
+        if not isinstance(q, str) or not q.strip():
+            problems.append(f"question {i} is empty or not a string")
+            continue
+        key = q.strip().lower()
+        if key in seen:
+            problems.append(f"question {i} is a duplicate")
+        seen.add(key)
+
+    mapping = data.get("trait_mapping")
+    if not isinstance(mapping, list):
+        problems.append("'trait_mapping' is not a list")
+        return problems
+    covered = set()
+    for tm in mapping:
+        if not isinstance(tm, dict):
+            problems.append("trait_mapping entry is not an object")
+            continue
+        idx = tm.get("index")
+        traits = tm.get("traits")
+        if not isinstance(idx, int) or not 0 <= idx < len(questions):
+            problems.append(f"trait_mapping index {idx!r} out of range")
+            continue
+        if not isinstance(traits, list) or not traits or not set(traits) <= ALLOWED_TRAITS:
+            problems.append(f"trait_mapping for question {idx} has invalid traits")
+            continue
+        covered.add(idx)
+    missing = sorted(set(range(len(questions))) - covered)
+    if missing:
+        problems.append(f"no trait_mapping for questions {missing}")
+    return problems
+
+
+def fingerprint(data):
+    """Stable ID of a question set, used to deduplicate the pool."""
+    norm = "\n".join(q.strip().lower() for q in data["questions"])
+    return hashlib.sha1(norm.encode("utf-8")).hexdigest()[:16]
+
+
+class QuestionPool:
+    """On-disk pool of validated question sets with a background refiller.
+
+    Each set is one JSON file named after its fingerprint, so a duplicate
+    generation simply overwrites nothing. A set is retired once it is older
+    than `max_age` seconds or has been served `max_serves` times.
+    """
+
+    def __init__(self, directory, generator, target=POOL_TARGET, low_water=POOL_LOW_WATER,
+                 max_age=POOL_MAX_AGE, max_serves=POOL_MAX_SERVES):
+        self.directory = directory
+        self.generator = generator
+        self.target = target
+        self.low_water = low_water
+        self.max_age = max_age
+        self.max_serves = max_serves
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        os.makedirs(directory, exist_ok=True)
+
+    # ---------- storage ----------
+    def _path(self, set_id):
+        return os.path.join(self.directory, f"{set_id}.json")
+
+    def _write(self, entry):
+        tmp = self._path(entry["id"]) + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(tmp, self._path(entry["id"]))
+
+    def _entries(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.directory, name), encoding="utf-8") as f:
+                    entries.append(json.load(f))
+            except (OSError, ValueError):
+                # half-written or corrupt file; drop it
+                self._remove(name[:-len(".json")])
+        return entries
+
+    def _remove(self, set_id):
+        try:
+            os.remove(self._path(set_id))
+        except FileNotFoundError:
+            pass
+
+    def _is_fresh(self, entry, now):
+        return (now - entry["created"] <= self.max_age
+                and entry["served"] < self.max_serves)
+
+    # ---------- public API ----------
+    def add(self, data):
+        """Validate and store a generated set. Returns False if rejected."""
+        problems = validate_question_set(data)
+        if problems:
+            print("[question_pool] rejected set:", "; ".join(problems))
+            return False
+        set_id = fingerprint(data)
+        with self._lock:
+            if os.path.exists(self._path(set_id)):
+                return False
+            self._write({"id": set_id, "created": time.time(), "served": 0, "data": data})
+        return True
+
+    def size(self):
+        now = time.time()
+        with self._lock:
+            return sum(1 for e in self._entries() if self._is_fresh(e, now))
+
+    def take(self):
+        """Hand out one fresh set (least-served first), or None if empty."""
+        now = time.time()
+        with self._lock:
+            fresh = []
+            for e in self._entries():
+                if self._is_fresh(e, now):
+                    fresh.append(e)
+                else:
+                    self._remove(e["id"])
+            entry = None
+            remaining = len(fresh)
+            if fresh:
+                least = min(e["served"] for e in fresh)
+                entry = random.choice([e for e in fresh if e["served"] == least])
+                entry["served"] += 1
+                if entry["served"] >= self.max_serves:
+                    self._remove(entry["id"])
+                    remaining -= 1
+                else:
+                    self._write(entry)
+
+        if remaining <= self.low_water:
+            self.request_refill()
+        return entry["data"] if entry else None
+
+    def refill(self):
+        """Generate sets until the pool is back at its target size."""
+        failures = 0
+        while self.size() < self.target and failures < 3:
+            try:
+                data = self.generator()
+            except Exception as e:
+                print("[question_pool] generation failed:", e)
+                data = None
+            if data is None or not self.add(data):
+                failures += 1
+                time.sleep(min(2 ** failures, 30))
+
+    # ---------- background refiller ----------
+    def request_refill(self):
+        self._wake.set()
+
+    def start(self, interval=600):
+        """Run the refiller in a daemon thread (idempotent)."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, args=(interval,),
+                                            name="question-pool-refiller", daemon=True)
+            self._thread.start()
+        self.request_refill()
+
+    def _run(self, interval):
+        while True:
+            self._wake.wait(timeout=interval)
+            self._wake.clear()
+            self.refill()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool(generator, directory=POOL_DIR):
+    """Process-wide pool shared by every session; starts the refiller."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = QuestionPool(directory, generator)
+            _pool.start()
+        return _pool
@@ -0,0 +1,172 @@
+# report_cache.py
+# ================================
+# PERSISTENT REPORT CACHE
+# ================================
+# Trait scores are five integers 0-100, and many respondents end up with
+# the same or nearly the same profile. Scores are quantized to multiples of
+# REPORT_CACHE_STEP, and reports are generated for and cached under that
+# bucket, so everyone in a bucket can be served from disk instead of a
+# 70B-model call.
+#
+# Each bucket keeps up to REPORT_CACHE_VARIANTS reports for variety. Until
+# a bucket has all of them, a lookup misses with probability
+# REPORT_CACHE_EXPLORE, so the caller generates and stores another variant.
+# When the database exceeds REPORT_CACHE_MAX_MB, the least recently used
+# reports are evicted. REPORT_CACHE_MAX_MB=0 disables the cache.
+import os
+import random
+import sqlite3
+import threading
+import time
+
+CACHE_PATH = os.environ.get("REPORT_CACHE_PATH", os.path.join("data", "report_cache.sqlite3"))
+CACHE_STEP = int(os.environ.get("REPORT_CACHE_STEP", "5"))
+CACHE_VARIANTS = int(os.environ.get("REPORT_CACHE_VARIANTS", "3"))
+CACHE_EXPLORE = float(os.environ.get("REPORT_CACHE_EXPLORE", "0.2"))
+CACHE_MAX_BYTES = int(float(os.environ.get("REPORT_CACHE_MAX_MB", "50")) * 1024 * 1024)
+
+
+def quantize(scores, step=CACHE_STEP):
+    """Scores rounded (half up) to the nearest multiple of `step`, same trait order."""
+    if step <= 1:
+        return dict(scores)
+    return {t: min(100, max(0, int(v / step + 0.5) * step)) for t, v in scores.items()}
+
+
+def bucket_key(bucket):
+    return "|".join(f"{t}={v}" for t, v in sorted(bucket.items()))
+
+
+class ReportCache:
+    """SQLite-backed cache of report texts, shared by processes on one host."""
+
+    def __init__(self, path=CACHE_PATH, step=CACHE_STEP, variants=CACHE_VARIANTS,
+                 explore=CACHE_EXPLORE, max_bytes=CACHE_MAX_BYTES):
+        self.path = path
+        self.step = step
+        self.variants = variants
+        self.explore = explore
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.explores = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._db = None
+        if self.enabled:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS reports ("
+                " bucket TEXT NOT NULL, variant INTEGER NOT NULL, text TEXT NOT NULL,"
+                " bytes INTEGER NOT NULL, created REAL NOT NULL, last_used REAL NOT NULL,"
+                " hits INTEGER NOT NULL DEFAULT 0, PRIMARY KEY (bucket, variant))"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS reports_lru ON reports (last_used)")
+            self._db.commit()
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    def bucket(self, scores):
+        """The quantized scores a report for `scores` is generated from."""
+        return quantize(scores, self.step)
+
+    def get(self, scores):
+        """A cached report for the bucket of `scores`, or None (miss or explore)."""
+        if not self.enabled:
+            return None
+        key = bucket_key(self.bucket(scores))
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT variant, text FROM reports WHERE bucket = ?", (key,)
+            ).fetchall()
+            if not rows:
+                self.misses += 1
+                return None
+            if len(rows) < self.variants and random.random() < self.explore:
+                self.explores += 1
+                self.misses += 1
+                return None
+            variant, text = random.choice(rows)
+            self._db.execute(
+                "UPDATE reports SET last_used = ?, hits = hits + 1 WHERE bucket = ? AND variant = ?",
+                (time.time(), key, variant)
+            )
+            self._db.commit()
+            self.hits += 1
+            return text
+
+    def put(self, scores, text):
+        """Store a report generated from bucket(scores) as a new variant."""
+        if not self.enabled or not text:
+            return
+        key = bucket_key(self.bucket(scores))
+        size = len(text.encode("utf-8"))
+        now = time.time()
+        with self._lock:
+            count, = self._db.execute(
+                "SELECT COUNT(*) FROM reports WHERE bucket = ?", (key,)
+            ).fetchone()
+            if count >= self.variants:
+                # a concurrent explore already filled the bucket; replace its LRU variant
+                variant, = self._db.execute(
+                    "SELECT variant FROM reports WHERE bucket = ? ORDER BY last_used LIMIT 1", (key,)
+                ).fetchone()
+            else:
+                variant, = self._db.execute(
+                    "SELECT COALESCE(MAX(variant) + 1, 0) FROM reports WHERE bucket = ?", (key,)
+                ).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO reports (bucket, variant, text, bytes, created, last_used)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (key, variant, text, size, now, now)
+            )
+            self._evict()
+            self._db.commit()
+
+    def _evict(self):
+        total, = self._db.execute("SELECT COALESCE(SUM(bytes), 0) FROM reports").fetchone()
+        while total > self.max_bytes:
+            row = self._db.execute(
+                "SELECT rowid, bytes FROM reports ORDER BY last_used LIMIT 1"
+            ).fetchone()
+            if row is None:
+                break
+            self._db.execute("DELETE FROM reports WHERE rowid = ?", (row[0],))
+            total -= row[1]
+            self.evictions += 1
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        out = {
+            "hits": self.hits,
+            "misses": self.misses,
+            "explores": self.explores,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": 0,
+            "buckets": 0,
+            "bytes": 0,
+        }
+        if self.enabled:
+            with self._lock:
+                out["entries"], out["buckets"], out["bytes"] = self._db.execute(
+                    "SELECT COUNT(*), COUNT(DISTINCT bucket), COALESCE(SUM(bytes), 0) FROM reports"
+                ).fetchone()
+        return out
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_report_cache():
+    """Process-wide report cache."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ReportCache()
+        return _cache
@@ -0,0 +1,217 @@
+# report_chunker.py
+# ================================
+# REPORT CHUNKING FOR RAG
+# ================================
+# generate_report() returns a summary paragraph followed by three bullet
+# lists (strengths, growth areas, recommendations) without headings. We
+# index one chunk per summary sentence / bullet, tagged with its section,
+# so rag_chat retrieves the few relevant passages instead of the whole
+# report.
+import re
+import threading
+
+SECTIONS = ["summary", "strengths", "growth_areas", "recommendations"]
+SECTION_TITLES = {
+    "summary": "Personality summary",
+    "strengths": "Strengths",
+    "growth_areas": "Growth areas",
+    "recommendations": "Recommendations",
+}
+
+# Intro lines like "Here are some areas where you can grow:" name their list
+_SECTION_HINTS = [
+    ("strengths", re.compile(r"strength|good at|excel", re.I)),
+    ("growth_areas", re.compile(r"grow|improv|develop|work on|challenge", re.I)),
+    ("recommendations", re.compile(r"recommend|suggest|tip|action|try", re.I)),
+]
+_BULLET = re.compile(r"^\s*(?:[-*•+]|\d+[.)])\s+")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+(?=[\"'A-Z])")
+_MIN_CHUNK_CHARS = 25
+_EMPHASIS = re.compile(r"\*\*|__")
+
+
+def _heading(line):
+    """The text of a heading line ("## Strengths", "**Growth Areas:**",
+    "Here are your strengths:"), or None for content."""
+    plain = _EMPHASIS.sub("", line).strip()
+    if line.startswith("#"):
+        return plain.lstrip("#").strip()
+    bold = line.startswith(("**", "__")) and line.endswith(("**", "__")) and len(plain) < 80
+    if plain.endswith(":") and len(plain) < 120 or bold and not plain.endswith((".", "!", "?")):
+        return plain
+    return None
+
+
+def _hinted_section(line):
+    for section, pattern in _SECTION_HINTS:
+        if pattern.search(line):
+            return section
+    return None
+
+
+def split_sentences(text):
+    return [s.strip() for s in _SENTENCE_END.split(text) if s.strip()]
+
+
+def _marker_kind(line):
+    marker = _BULLET.match(line).group(0).strip()
+    return "numbered" if marker[0].isdigit() else marker
+
+
+def chunk_report(text):
+    """Split a report into section-tagged chunks.
+
+    Returns a list of {"text", "section", "position"} dicts in report order.
+    Summary paragraphs are split into sentences (very short ones are merged
+    into their neighbour); each bullet is one chunk.
+    """
+    chunks = []
+    section = "summary"
+    next_list = 1          # index into SECTIONS of the next unnamed list
+    list_kind = None       # marker kind of the list we are in, if any
+    pending_hint = None
+
+    def emit(piece, merge_short=False):
+        piece = piece.replace("**", "").strip()
+        if not piece:
+            return
+        if (merge_short and chunks and chunks[-1]["section"] == section
+                and len(chunks[-1]["text"]) < _MIN_CHUNK_CHARS):
+            chunks[-1]["text"] += " " + piece
+            return
+        chunks.append({"text": piece, "section": section, "position": len(chunks)})
+
+    for raw in text.splitlines():
+        line = raw.strip()
+        if not line:
+            continue
+
+        if _BULLET.match(line):
+            kind = _marker_kind(line)
+            # a new list starts after prose, on a new marker style, or when
+            # numbering restarts at 1
+            restarted = kind == "numbered" and re.match(r"1[.)]", line)
+            if list_kind != kind or restarted:
+                if pending_hint is not None:
+                    section = pending_hint
+                    next_list = SECTIONS.index(pending_hint) + 1
+                elif next_list < len(SECTIONS):
+                    section = SECTIONS[next_list]
+                    next_list += 1
+                list_kind = kind
+                pending_hint = None
+            emit(_BULLET.sub("", line))
+            continue
+
+        list_kind = None
+        heading = _heading(line)
+        if heading is not None:
+            # a heading or list intro ("Here are four strengths:"), not content
+            pending_hint = _hinted_section(heading)
+            continue
+        if section != "summary":
+            # prose between or after the lists, e.g. a closing remark
+            pending_hint = _hinted_section(line)
+        for sentence in split_sentences(line):
+            emit(sentence, merge_short=True)
+
+    return chunks
+
+
+def format_chunks(chunks):
+    """Render retrieved chunks grouped under their section titles."""
+    by_section = {}
+    for c in chunks:
+        by_section.setdefault(c["section"], []).append(c)
+    blocks = []
+    for section in SECTIONS:
+        items = sorted(by_section.get(section, []), key=lambda c: c["position"])
+        if items:
+            lines = "\n".join(f"- {c['text']}" for c in items)
+            blocks.append(f"{SECTION_TITLES[section]}:\n{lines}")
+    return "\n\n".join(blocks)
+
+
+class ChunkEmbedder:
+    """Embeds report chunks, starting on complete lines while streaming.
+
+    feed() is called with the partial report as it streams in; chunks from
+    finished lines are encoded in the background right away. finish() then
+    encodes only what is still missing, in a single batched encode() call.
+    """
+
+    def __init__(self, encode, submit):
+        self._encode = encode
+        self._submit = submit
+        self._lock = threading.Lock()
+        self._futures = {}
+
+    def feed(self, partial_text):
+        complete = partial_text[:partial_text.rfind("\n") + 1]
+        if not complete:
+            return
+        texts = [c["text"] for c in chunk_report(complete)[:-1]]  # last may still grow
+        with self._lock:
+            texts = [t for t in texts if t not in self._futures]
+            if not texts:
+                return
+            future = self._submit(self._encode, texts)
+            for i, t in enumerate(texts):
+                self._futures[t] = (future, i)
+
+    def finish(self, chunks):
+        """Vectors for `chunks`, in order."""
+        texts = [c["text"] for c in chunks]
+        vectors = [None] * len(texts)
+        missing = []
+        for i, t in enumerate(texts):
+            entry = self._futures.get(t)
+            if entry is None:
+                missing.append(i)
+                continue
+            future, row = entry
+            if future.cancel():
+                # still queued behind other jobs: encode it in the batch below
+                # rather than wait on a pool we may be running on ourselves
+                missing.append(i)
+                continue
+            try:
+                vectors[i] = future.result()[row]
+            except Exception:
+                missing.append(i)
+        if missing:
+            encoded = self._encode([texts[i] for i in missing])
+            for i, vec in zip(missing, encoded):
+                vectors[i] = vec
+        return vectors
+
+
+# ================================
+# RETRIEVAL PRECISION
+# ================================
+DEFAULT_PROBES = [
+    ("What are my strengths?", "strengths"),
+    ("What am I naturally good at?", "strengths"),
+    ("What should I work on?", "growth_areas"),
+    ("Where do I need to improve?", "growth_areas"),
+    ("What do you recommend I do next?", "recommendations"),
+    ("Give me some practical tips.", "recommendations"),
+    ("Describe my personality in a few words.", "summary"),
+]
+
+
+def retrieval_precision(retrieve, probes=DEFAULT_PROBES):
+    """Mean section precision of `retrieve(query) -> list of chunk dicts`.
+
+    A retrieved chunk counts as relevant when its section matches the
+    section the probe question is about.
+    """
+    scores = []
+    for query, expected in probes:
+        retrieved = retrieve(query)
+        if retrieved:
+            relevant = sum(1 for c in retrieved if c["section"] == expected)
+            scores.append(relevant / len(retrieved))
+        else:
+            scores.append(0.0)
+    return sum(scores) / len(scores) if scores else 0.0
@@ -0,0 +1,211 @@
+# scoring.py
+# ================================
+# SCORING THE TEST
+# ================================
+# score_answers() scores one respondent, as used by the app. score_matrix()
+# is the vectorized equivalent for bulk re-scoring and cohort analysis:
+# it takes a respondents x questions answer matrix and returns every
+# respondent's 0-100 trait scores in one pass, bit-for-bit identical to
+# score_answers().
+#
+# Headless use:
+#   python scoring.py answers.csv --mapping mapping.json --output scores.csv
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+
+ANSWER_VALUES = {
+    "Strongly Disagree": 1,
+    "Disagree": 2,
+    "Neutral": 3,
+    "Agree": 4,
+    "Strongly Agree": 5
+}
+DEFAULT_TRAIT = "Openness"
+
+
+def score_answers(answers):
+    trait_scores = {}
+    trait_counts = {}
+
+    for ans in answers:
+        trait = ans["trait"]
+        value = ans["value"]
+        if trait not in trait_scores:
+            trait_scores[trait] = 0
+            trait_counts[trait] = 0
+        trait_scores[trait] += value
+        trait_counts[trait] += 1
+
+    # normalize 0-100
+    for t in trait_scores:
+        trait_scores[t] = round((trait_scores[t] / (trait_counts[t] * 5)) * 100)
+
+    return trait_scores
+
+
+# ================================
+# VECTORIZED BULK SCORING
+# ================================
+def trait_matrix(question_traits, traits=None):
+    """One-hot (questions x traits) matrix and the trait order used.
+
+    Traits default to order of first appearance, like score_answers().
+    """
+    if traits is None:
+        traits = list(dict.fromkeys(question_traits))
+    col = {t: j for j, t in enumerate(traits)}
+    m = np.zeros((len(question_traits), len(traits)))
+    m[np.arange(len(question_traits)), [col[t] for t in question_traits]] = 1.0
+    return m, traits
+
+
+def score_matrix(answers, question_traits, traits=None):
+    """Score many respondents at once.
+
+    answers: (respondents x questions) array of 1-5 values, NaN = unanswered.
+    question_traits: trait name per question column.
+    Returns (traits, scores) where scores is a (respondents x traits) float
+    array of whole numbers, NaN where a respondent answered nothing for a
+    trait (score_answers() would omit that key).
+    """
+    a = np.asarray(answers, dtype=np.float64)
+    if a.ndim == 1:
+        a = a[np.newaxis, :]
+    m, traits = trait_matrix(question_traits, traits)
+
+    answered = ~np.isnan(a)
+    sums = np.where(answered, a, 0.0) @ m
+    counts = answered.astype(np.float64) @ m
+    with np.errstate(invalid="ignore", divide="ignore"):
+        # same operation order as score_answers(); np.round and round() both
+        # round half to even, so results match exactly
+        scores = np.round((sums / (counts * 5)) * 100)
+    scores[counts == 0] = np.nan
+    return traits, scores
+
+
+def scores_to_dicts(traits, scores):
+    """Per-respondent {trait: int} dicts, as score_answers() returns them."""
+    return [
+        {t: int(v) for t, v in zip(traits, row) if not np.isnan(v)}
+        for row in scores
+    ]
+
+
+def answers_to_matrix(frame, columns):
+    """Numeric answer matrix from a DataFrame of 1-5 values or option labels."""
+    import pandas as pd
+    block = frame[columns]
+    numeric = block.apply(pd.to_numeric, errors="coerce")
+    labels = block.apply(lambda col: col.map(ANSWER_VALUES))
+    out = np.array(numeric.where(numeric.notna(), labels), dtype=np.float64)
+    out[(out < 1) | (out > 5)] = np.nan
+    return out
+
+
+def load_mapping(path):
+    """question column -> trait, from a plain dict or a generated question set.
+
+    A generated set ({"questions": [...], "trait_mapping": [...]}) maps
+    columns q0..qN, using the first listed trait like the app does.
+    """
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if "trait_mapping" not in data:
+        return dict(data)
+    mapping = {}
+    for i in range(len(data["questions"])):
+        trait = DEFAULT_TRAIT
+        for tm in data.get("trait_mapping", []):
+            if tm.get("index") == i and tm.get("traits"):
+                trait = tm["traits"][0]
+                break
+        mapping[f"q{i}"] = trait
+    return mapping
+
+
+# ================================
+# STREAMING BATCH COMMAND
+# ================================
+def iter_input(path, columns, chunk_size):
+    """Yield DataFrames of at most chunk_size rows from CSV or Parquet."""
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size, columns=columns):
+            yield batch.to_pandas()
+    else:
+        import pandas as pd
+        yield from pd.read_csv(path, usecols=columns, chunksize=chunk_size)
+
+
+class _OutputWriter:
+    """Appends score chunks to CSV or Parquet without holding them all."""
+
+    def __init__(self, path):
+        self.path = path
+        self._parquet = None
+        self._first = True
+
+    def write(self, frame):
+        if self.path.endswith(".parquet"):
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if self._parquet is None:
+                self._parquet = pq.ParquetWriter(self.path, table.schema)
+            self._parquet.write_table(table)
+        else:
+            frame.to_csv(self.path, mode="w" if self._first else "a", header=self._first, index=False)
+        self._first = False
+
+    def close(self):
+        if self._parquet is not None:
+            self._parquet.close()
+
+
+def score_file(input_path, output_path, mapping, id_column=None, chunk_size=50_000):
+    """Score a respondents file chunk by chunk; returns rows written."""
+    import pandas as pd
+    question_columns = list(mapping)
+    question_traits = [mapping[c] for c in question_columns]
+    traits = list(dict.fromkeys(question_traits))
+    columns = ([id_column] if id_column else []) + question_columns
+
+    writer = _OutputWriter(output_path)
+    rows = 0
+    try:
+        for frame in iter_input(input_path, columns, chunk_size):
+            _, scores = score_matrix(answers_to_matrix(frame, question_columns), question_traits, traits)
+            out = pd.DataFrame(scores, columns=traits).astype("Int64")
+            if id_column:
+                out.insert(0, id_column, frame[id_column].to_numpy())
+            writer.write(out)
+            rows += len(out)
+    finally:
+        writer.close()
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk-score Big Five answers (CSV or Parquet).")
+    parser.add_argument("input", help="answers file, one row per respondent (.csv or .parquet)")
+    parser.add_argument("--mapping", required=True,
+                        help="JSON: {column: trait} or a generated question set (columns q0..qN)")
+    parser.add_argument("--output", required=True, help="scores file (.csv or .parquet)")
+    parser.add_argument("--id-column", help="respondent ID column copied to the output")
+    parser.add_argument("--chunk-size", type=int, default=50_000, help="rows held in memory at a time")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.input):
+        parser.error(f"input file not found: {args.input}")
+    rows = score_file(args.input, args.output, load_mapping(args.mapping), args.id_column, args.chunk_size)
+    print(f"Scored {rows} respondents -> {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
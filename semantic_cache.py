@@ -0,0 +1,117 @@
+# semantic_cache.py
+# ================================
+# SEMANTIC ANSWER CACHE FOR RAG_CHAT
+# ================================
+# Near-identical questions ("what are my strengths?" / "what are my main
+# strengths?") against the same profile chunks get the same answer. Entries
+# are keyed on a fingerprint of the retrieved chunks plus the query
+# embedding, and a lookup hits when the cosine similarity to a cached query
+# with the same fingerprint reaches the threshold. The cache is process-wide,
+# so sessions whose profiles are identical share answers.
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+CACHE_THRESHOLD = float(os.environ.get("SEMANTIC_CACHE_THRESHOLD", "0.9"))
+CACHE_TTL = float(os.environ.get("SEMANTIC_CACHE_TTL", "3600"))
+CACHE_MAX_ENTRIES = int(os.environ.get("SEMANTIC_CACHE_MAX_ENTRIES", "10000"))
+CACHE_MAX_BYTES = int(os.environ.get("SEMANTIC_CACHE_MAX_MB", "64")) * 1024 * 1024
+
+_ENTRY_OVERHEAD = 256  # rough per-entry bookkeeping cost in bytes
+
+
+def chunks_fingerprint(chunks):
+    """Order-independent fingerprint of the retrieved profile chunks."""
+    h = hashlib.sha1()
+    for text in sorted(c["text"] for c in chunks):
+        h.update(text.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def _normalize(vec):
+    vec = np.asarray(vec, dtype="float32").reshape(-1)
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm else vec
+
+
+class SemanticCache:
+    """Thread-safe LRU + TTL cache of answers, bounded by count and bytes."""
+
+    def __init__(self, threshold=CACHE_THRESHOLD, ttl=CACHE_TTL,
+                 max_entries=CACHE_MAX_ENTRIES, max_bytes=CACHE_MAX_BYTES):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # key -> (fingerprint, vec, answer, expires, size)
+        self._by_fingerprint = {}       # fingerprint -> set of keys
+        self._next_key = 0
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _drop(self, key):
+        fp, _, _, _, size = self._entries.pop(key)
+        keys = self._by_fingerprint[fp]
+        keys.discard(key)
+        if not keys:
+            del self._by_fingerprint[fp]
+        self.bytes -= size
+
+    def get(self, query_vec, fingerprint):
+        """Cached answer for a similar query on the same chunks, or None."""
+        query = _normalize(query_vec)
+        now = time.monotonic()
+        with self._lock:
+            best_key, best_sim = None, self.threshold
+            for key in list(self._by_fingerprint.get(fingerprint, ())):
+                _, vec, _, expires, _ = self._entries[key]
+                if expires < now:
+                    self._drop(key)
+                    continue
+                sim = float(vec @ query)
+                if sim >= best_sim:
+                    best_key, best_sim = key, sim
+            if best_key is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(best_key)
+            return self._entries[best_key][2]
+
+    def put(self, query_vec, fingerprint, answer):
+        size = _ENTRY_OVERHEAD + len(answer.encode("utf-8")) + np.asarray(query_vec).size * 4
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            key = self._next_key
+            self._next_key += 1
+            self._entries[key] = (fingerprint, _normalize(query_vec), answer,
+                                  time.monotonic() + self.ttl, size)
+            self._by_fingerprint.setdefault(fingerprint, set()).add(key)
+            self.bytes += size
+            while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+answer_cache = SemanticCache()
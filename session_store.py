@@ -0,0 +1,284 @@
+# session_store.py
+# ================================
+# SHARED SESSION STORE
+# ================================
+# The durable part of a user's session (questions, answers, scores, report,
+# recent chat) lives outside the Streamlit process, keyed by the user ID
+# from the URL. Any app worker behind a load balancer can then pick the
+# session up, and a restart loses nothing. Reports and their embeddings
+# are already shared through vector_store.py.
+#
+#   - each field is stored separately as compact JSON, zlib-compressed
+#     when that helps
+#   - a session is loaded the first time its user hits a worker, and each
+#     field is decoded only when first read
+#   - writes are write-behind: a rerun queues only the fields that changed,
+#     and a background thread flushes them every SESSION_FLUSH_INTERVAL
+#     seconds
+#
+# Backends (SESSION_STORE):
+#   sqlite       one SQLite file, shared by workers on one host (default)
+#   redis        a Redis server at REDIS_URL (needs the `redis` package)
+#   local-redis  in-process stand-in with the same client API, for
+#                development and tests without a Redis server
+import atexit
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+import metrics
+
+SESSION_STORE = os.environ.get("SESSION_STORE", "sqlite")
+SESSION_DB_PATH = os.environ.get("SESSION_DB_PATH", os.path.join("data", "sessions.sqlite3"))
+REDIS_URL = os.environ.get("REDIS_URL", "redis://localhost:6379/0")
+SESSION_TTL = float(os.environ.get("SESSION_TTL_DAYS", "30")) * 86400
+SESSION_FLUSH_INTERVAL = float(os.environ.get("SESSION_FLUSH_INTERVAL", "1.0"))
+
+_COMPRESS_MIN = 256  # smaller values are stored as plain JSON
+
+
+def encode(value):
+    raw = json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    if len(raw) >= _COMPRESS_MIN:
+        packed = zlib.compress(raw, 6)
+        if len(packed) < len(raw):
+            return b"z" + packed
+    return b"j" + raw
+
+
+def decode(blob):
+    blob = bytes(blob)
+    raw = zlib.decompress(blob[1:]) if blob[:1] == b"z" else blob[1:]
+    return json.loads(raw.decode("utf-8"))
+
+
+# ================================
+# BACKENDS
+# ================================
+class SQLiteSessionBackend:
+    def __init__(self, path=SESSION_DB_PATH, ttl=SESSION_TTL):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS session_fields ("
+            " uid TEXT NOT NULL, field TEXT NOT NULL, value BLOB NOT NULL,"
+            " updated REAL NOT NULL, PRIMARY KEY (uid, field))"
+        )
+        self._db.execute("DELETE FROM session_fields WHERE updated < ?", (time.time() - ttl,))
+        self._db.commit()
+
+    def load(self, uid):
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT field, value FROM session_fields WHERE uid = ?", (uid,)
+            ).fetchall()
+        return {field: value for field, value in rows}
+
+    def save(self, uid, fields):
+        now = time.time()
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO session_fields (uid, field, value, updated) VALUES (?, ?, ?, ?)",
+                [(uid, f, sqlite3.Binary(v), now) for f, v in fields.items()]
+            )
+            self._db.commit()
+
+    def delete(self, uid):
+        with self._lock:
+            self._db.execute("DELETE FROM session_fields WHERE uid = ?", (uid,))
+            self._db.commit()
+
+
+class LocalRedis:
+    """Thread-safe in-process stand-in for the redis-py calls used here."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hashes = {}
+        self._expires = {}
+
+    def _live(self, key):
+        expires = self._expires.get(key)
+        if expires is not None and expires <= time.time():
+            self._hashes.pop(key, None)
+            self._expires.pop(key, None)
+        return self._hashes.get(key)
+
+    @staticmethod
+    def _b(value):
+        return value if isinstance(value, bytes) else str(value).encode("utf-8")
+
+    def ping(self):
+        return True
+
+    def hgetall(self, key):
+        with self._lock:
+            return dict(self._live(self._b(key)) or {})
+
+    def hset(self, key, mapping):
+        with self._lock:
+            key = self._b(key)
+            h = self._live(key)
+            if h is None:
+                h = self._hashes[key] = {}
+            for field, value in mapping.items():
+                h[self._b(field)] = self._b(value)
+            return len(mapping)
+
+    def expire(self, key, seconds):
+        with self._lock:
+            key = self._b(key)
+            if self._live(key) is None:
+                return False
+            self._expires[key] = time.time() + seconds
+            return True
+
+    def delete(self, *keys):
+        with self._lock:
+            removed = 0
+            for key in map(self._b, keys):
+                removed += self._hashes.pop(key, None) is not None
+                self._expires.pop(key, None)
+            return removed
+
+
+class RedisSessionBackend:
+    """One hash per session (field -> encoded value), expiring after the TTL."""
+
+    def __init__(self, client, ttl=SESSION_TTL, prefix="session:"):
+        self.client = client
+        self.ttl = int(ttl)
+        self.prefix = prefix
+
+    def load(self, uid):
+        raw = self.client.hgetall(self.prefix + uid)
+        return {(f.decode("utf-8") if isinstance(f, bytes) else f): v for f, v in raw.items()}
+
+    def save(self, uid, fields):
+        key = self.prefix + uid
+        self.client.hset(key, mapping=fields)
+        self.client.expire(key, self.ttl)
+
+    def delete(self, uid):
+        self.client.delete(self.prefix + uid)
+
+
+def make_backend(name=SESSION_STORE):
+    if name == "sqlite":
+        return SQLiteSessionBackend()
+    if name == "redis":
+        import redis
+        return RedisSessionBackend(redis.Redis.from_url(REDIS_URL))
+    if name == "local-redis":
+        return RedisSessionBackend(LocalRedis())
+    raise ValueError(f"Unknown SESSION_STORE {name!r}; expected sqlite, redis or local-redis")
+
+
+# ================================
+# WRITE-BEHIND STORE
+# ================================
+class SessionHandle:
+    """One user's stored session, as seen from one browser session."""
+
+    def __init__(self, store, uid):
+        self.store = store
+        self.uid = uid
+        self._raw = None
+        self._digests = {}
+
+    def _load(self):
+        if self._raw is None:
+            self._raw = self.store.backend.load(self.uid)
+            self._digests = {f: hashlib.blake2b(v, digest_size=16).digest() for f, v in self._raw.items()}
+        return self._raw
+
+    def get(self, field, default=None):
+        """Stored value of `field` (decoded on first read), or `default`."""
+        raw = self._load()
+        if field not in raw:
+            return default
+        try:
+            return decode(raw[field])
+        except (ValueError, zlib.error) as e:
+            print(f"[session_store] dropping unreadable field {field!r}:", e)
+            return default
+
+    def save(self, fields):
+        """Queue the fields whose serialized form changed since the last save."""
+        self._load()
+        changed = {}
+        for field, value in fields.items():
+            blob = encode(value)
+            digest = hashlib.blake2b(blob, digest_size=16).digest()
+            if self._digests.get(field) != digest:
+                self._digests[field] = digest
+                changed[field] = blob
+        if changed:
+            self.store.enqueue(self.uid, changed)
+        return len(changed)
+
+
+class SessionStore:
+    def __init__(self, backend, flush_interval=SESSION_FLUSH_INTERVAL):
+        self.backend = backend
+        self.flush_interval = flush_interval
+        self._pending = {}   # uid -> {field: blob}, newest wins
+        self._lock = threading.Lock()
+        self.stats = {"flushes": 0, "fields_written": 0, "bytes_written": 0, "errors": 0}
+        self._thread = threading.Thread(target=self._run, name="session-flusher", daemon=True)
+        self._thread.start()
+        atexit.register(self.flush)
+
+    def open(self, uid):
+        return SessionHandle(self, uid)
+
+    def enqueue(self, uid, fields):
+        with self._lock:
+            self._pending.setdefault(uid, {}).update(fields)
+
+    def pending(self):
+        with self._lock:
+            return sum(len(f) for f in self._pending.values())
+
+    def flush(self):
+        with self._lock:
+            batch, self._pending = self._pending, {}
+        for uid, fields in batch.items():
+            try:
+                self.backend.save(uid, fields)
+                self.stats["fields_written"] += len(fields)
+                self.stats["bytes_written"] += sum(len(v) for v in fields.values())
+            except Exception as e:
+                print("[session_store] flush failed, will retry:", e)
+                self.stats["errors"] += 1
+                with self._lock:
+                    # keep anything newer that arrived meanwhile
+                    newer = self._pending.get(uid, {})
+                    self._pending[uid] = dict(fields, **newer)
+        if batch:
+            self.stats["flushes"] += 1
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_session_store():
+    """Process-wide session store for the backend named by SESSION_STORE."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = SessionStore(make_backend())
+            metrics.register_collector("session_store", lambda: dict(_store.stats, pending=_store.pending()))
+        return _store
@@ -0,0 +1,137 @@
+# submit_pipeline.py
+# ================================
+# BACKGROUND SUBMIT PIPELINE
+# ================================
+# Slow work triggered from the UI (report generation, embedding, question
+# prefetch, LLM connection warm-up) runs on a process-wide thread pool
+# instead of the Streamlit script thread. Jobs keep their own results, and
+# the script copies them into st.session_state on a later rerun, so a rerun
+# that gets interrupted (another click, a chat message) never loses work.
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("SUBMIT_PIPELINE_WORKERS", "8")),
+    thread_name_prefix="submit-pipeline"
+)
+
+
+def submit(fn, *args, **kwargs):
+    """Run fn on the shared pipeline pool and return its Future."""
+    return _executor.submit(fn, *args, **kwargs)
+
+
+class ReportJob:
+    """Consumes a token stream in the background and buffers the text.
+
+    Any number of readers can follow the job with tokens(): each replays
+    what has already arrived and then waits for new tokens, so a rerun can
+    re-attach to a job that an earlier rerun started.
+
+    on_partial(text_so_far) is called after every token that completes a
+    line, so downstream work (e.g. embedding) can start before the end.
+    on_complete(report) runs once the report is complete; its failure is
+    kept in index_error and does not make the report itself an error.
+    """
+
+    def __init__(self, token_stream_fn, *args, on_complete=None, on_partial=None):
+        self._token_stream_fn = token_stream_fn
+        self._args = args
+        self._on_complete = on_complete
+        self._on_partial = on_partial
+        self._parts = []
+        self._cond = threading.Condition()
+        self.done = False
+        self.error = None
+        self.index_error = None
+        self.report = None
+        self.future = None
+
+    def start(self):
+        self.future = _executor.submit(self._run)
+        return self
+
+    def _run(self):
+        try:
+            for token in self._token_stream_fn(*self._args):
+                with self._cond:
+                    self._parts.append(token)
+                    self._cond.notify_all()
+                if self._on_partial is not None and "\n" in token:
+                    self._on_partial("".join(self._parts))
+            self.report = self.text
+        except Exception as e:
+            print("Report job failed:", e)
+            self.error = e
+        else:
+            if self._on_complete is not None:
+                try:
+                    self._on_complete(self.report)
+                except Exception as e:
+                    # the report is complete; only its indexing failed
+                    print("Report job post-processing failed:", e)
+                    self.index_error = e
+        finally:
+            with self._cond:
+                self.done = True
+                self._cond.notify_all()
+
+    @property
+    def text(self):
+        with self._cond:
+            return "".join(self._parts).strip()
+
+    def tokens(self):
+        """Yield every token so far, then new ones until the job finishes."""
+        i = 0
+        while True:
+            with self._cond:
+                while i >= len(self._parts) and not self.done:
+                    self._cond.wait()
+                new = self._parts[i:]
+                finished = self.done
+            for token in new:
+                yield token
+            i += len(new)
+            if finished and i >= len(self._parts):
+                return
+
+
+def start_report_job(token_stream_fn, *args, on_complete=None, on_partial=None):
+    return ReportJob(token_stream_fn, *args, on_complete=on_complete, on_partial=on_partial).start()
+
+
+# ================================
+# SPECULATIVE PREFETCH
+# ================================
+_warm_lock = threading.Lock()
+_last_warm = 0.0
+WARM_INTERVAL = 60  # seconds; roughly the provider's keep-alive window
+
+
+def warm_llm_connection(llm):
+    """Open (or keep alive) the pooled HTTPS connection to the LLM API.
+
+    A cheap authenticated request (LLMGateway.warm) is enough to complete
+    DNS, TCP and TLS, so the real completion request that follows skips
+    the handshake. Rate-limited process-wide to one call per WARM_INTERVAL.
+    """
+    global _last_warm
+    with _warm_lock:
+        now = time.monotonic()
+        if now - _last_warm < WARM_INTERVAL:
+            return None
+        _last_warm = now
+
+    return _executor.submit(llm.warm)
+
+
+def prefetch_while_answering(llm, question_pool, embed_loader):
+    """Kick off work the submit path will need while the user is answering."""
+    warm_llm_connection(llm)
+    # top the pool up now so the *next* test is a local lookup too
+    question_pool.request_refill()
+    # make sure the embedding model is resident before the report lands
+    _executor.submit(embed_loader)
@@ -0,0 +1,494 @@
+# vector_store.py
+# ================================
+# PERSISTENT SERVER-SIDE VECTOR STORE
+# ================================
+# One store per server process, shared by every session and namespaced by
+# user ID. Everything lives in a directory on disk:
+#
+#   vectors.f32   append-only float32 rows (row number == document ID)
+#   docs.dat      append-only UTF-8 JSON payloads {"text": ..., "meta": ...}
+#   docs.idx      fixed-size records (offset, length, kind, user hash), one per ID
+#   index.faiss   compacted FAISS snapshot of the first N rows, mmap-loaded
+#   ivfpq.trained empty trained IVF-PQ index reused across compactions (ivfpq only)
+#
+# Appends write payload and vector first and the idx record last, each
+# fsync'ed, so a crash can only leave an orphaned tail that is truncated on
+# the next open. Rows newer than the snapshot live in a small in-memory
+# delta index until compact() folds them into a new snapshot. add()
+# starts that on a background thread. The index is built from vectors.f32
+# without the store lock, and only the swap takes it, so searches never
+# wait for a rebuild. A snapshot of the right type is extended with the
+# new rows, not rebuilt; IVF-PQ is rebuilt only when it is retrained.
+#
+# The snapshot type is chosen with VECTOR_INDEX_TYPE:
+#   flat   exact brute force (default)
+#   ivfpq  inverted lists of 48-byte PQ codes; candidates are re-scored
+#          exactly against vectors.f32
+#   hnsw   graph index over the full vectors
+# Below VECTOR_ANN_MIN_VECTORS rows the snapshot stays flat; the ANN index
+# is built and, for IVF-PQ, trained at the first compaction past that size.
+# vectors.f32 is always the source of truth, so switching types only needs
+# a compact(). Searches restricted to a few thousand IDs (one user's
+# chunks, the usual case) skip the index and are computed exactly from
+# vectors.f32, so their cost does not grow with the store. Each user's IDs
+# come from an in-memory (user, kind) -> IDs index kept next to the idx
+# records, so finding them doesn't scan the store either.
+import hashlib
+import json
+import os
+import threading
+
+import faiss
+import numpy as np
+
+import metrics
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process use only
+    fcntl = None
+
+STORE_DIR = os.environ.get("VECTOR_STORE_DIR", os.path.join("data", "vector_store"))
+COMPACT_THRESHOLD = int(os.environ.get("VECTOR_STORE_COMPACT_THRESHOLD", "5000"))
+INDEX_TYPES = ("flat", "ivfpq", "hnsw")
+INDEX_TYPE = os.environ.get("VECTOR_INDEX_TYPE", "flat")
+ANN_MIN_VECTORS = int(os.environ.get("VECTOR_ANN_MIN_VECTORS", "50000"))
+EXACT_SEARCH_MAX = int(os.environ.get("VECTOR_EXACT_SEARCH_MAX", "4096"))
+IVF_NLIST = int(os.environ.get("VECTOR_IVF_NLIST", "0"))  # 0 = about 4 * sqrt(rows)
+IVF_NPROBE = int(os.environ.get("VECTOR_IVF_NPROBE", "16"))
+PQ_M = int(os.environ.get("VECTOR_PQ_M", "48"))           # bytes per vector, must divide the dimension
+PQ_RERANK = int(os.environ.get("VECTOR_PQ_RERANK", "4"))  # candidates re-scored per result
+HNSW_M = int(os.environ.get("VECTOR_HNSW_M", "32"))
+HNSW_EF_SEARCH = int(os.environ.get("VECTOR_HNSW_EF_SEARCH", "64"))
+_ADD_BATCH = 16_384   # rows copied per GIL-holding step while building
+
+RECORD_DTYPE = np.dtype([("offset", "<i8"), ("length", "<i4"), ("kind", "<i4"), ("user", "<u8")])
+
+# Retrieval searches chunks only; the full report is kept as its own
+# record so a new session can restore it without re-assembling chunks.
+KIND_CHUNK = 0
+KIND_REPORT = 1
+
+# Zero-copy loading of flat codes needs a recent FAISS; older builds accept
+# the flags and fall back to a normal read. Some index types refuse the
+# combined flags, so loading falls back through this list.
+_MMAP_FLAGS = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY | getattr(faiss, "IO_FLAG_MMAP_IFC", 0)
+_READ_FLAGS = (_MMAP_FLAGS, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY, 0)
+
+
+def user_key(user_id):
+    """64-bit namespace key stored with every document."""
+    digest = hashlib.blake2b(str(user_id).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+def _new_flat_index(dimension):
+    return faiss.IndexIDMap2(faiss.IndexFlatL2(dimension))
+
+
+def index_kind(index):
+    """"flat", "ivfpq" or "hnsw" for a (possibly ID-mapped) FAISS index."""
+    inner = index
+    if isinstance(index, (faiss.IndexIDMap, faiss.IndexIDMap2)):
+        inner = faiss.downcast_index(index.index)
+    if isinstance(inner, faiss.IndexIVF):
+        return "ivfpq"
+    if isinstance(inner, faiss.IndexHNSW):
+        return "hnsw"
+    return "flat"
+
+
+def _add_batched(index, vectors, ids):
+    # vectors may be a memmap; only one batch at a time is paged in
+    for start in range(0, len(ids), _ADD_BATCH):
+        stop = start + _ADD_BATCH
+        index.add_with_ids(np.ascontiguousarray(vectors[start:stop]), ids[start:stop])
+
+
+def train_ivfpq(vectors, nlist=IVF_NLIST, m=PQ_M, seed=0):
+    """Empty IVF-PQ index trained on a sample of `vectors`."""
+    n, dimension = vectors.shape
+    nlist = nlist or int(min(65536, max(16, 4 * np.sqrt(n))))
+    index = faiss.IndexIVFPQ(faiss.IndexFlatL2(dimension), dimension, nlist, m, 8)
+    # ~64 points per list (and >= 256 per PQ centroid) is plenty for k-means
+    sample_size = min(n, max(64 * nlist, 20_000))
+    if sample_size < n:
+        rows = np.sort(np.random.default_rng(seed).choice(n, sample_size, replace=False))
+        sample = np.ascontiguousarray(vectors[rows])
+    else:
+        sample = np.ascontiguousarray(vectors[:n])
+    index.train(sample)
+    return index
+
+
+def build_index(vectors, ids, index_type=INDEX_TYPE, min_vectors=ANN_MIN_VECTORS, trained=None,
+                hnsw_m=HNSW_M):
+    """Snapshot index over `vectors` (array or memmap) with the given IDs.
+
+    Falls back to flat below `min_vectors` rows. `trained` is an empty,
+    already trained IVF-PQ index to fill instead of training a new one.
+    """
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown VECTOR_INDEX_TYPE {index_type!r}; expected one of {INDEX_TYPES}")
+    n, dimension = vectors.shape
+    if index_type == "ivfpq" and n >= min_vectors:
+        index = faiss.clone_index(trained) if trained is not None else train_ivfpq(vectors)
+    elif index_type == "hnsw" and n >= min_vectors:
+        index = faiss.IndexIDMap2(faiss.IndexHNSWFlat(dimension, hnsw_m))
+    else:
+        index = _new_flat_index(dimension)
+    _add_batched(index, vectors, np.asarray(ids, dtype="int64"))
+    return index
+
+
+def search_params(index, selector=None, k=1):
+    """SearchParameters matching the index type, with the tuned probe depth."""
+    kind = index_kind(index)
+    if kind == "ivfpq":
+        return faiss.SearchParametersIVF(sel=selector, nprobe=IVF_NPROBE)
+    if kind == "hnsw":
+        return faiss.SearchParametersHNSW(sel=selector, efSearch=max(HNSW_EF_SEARCH, k))
+    return faiss.SearchParameters(sel=selector)
+
+
+class VectorStore:
+    def __init__(self, directory, dimension):
+        self.directory = directory
+        self.dimension = dimension
+        self.row_bytes = dimension * 4
+        self._lock = threading.RLock()
+        os.makedirs(directory, exist_ok=True)
+
+        self._vec_path = os.path.join(directory, "vectors.f32")
+        self._dat_path = os.path.join(directory, "docs.dat")
+        self._idx_path = os.path.join(directory, "docs.idx")
+        self._snap_path = os.path.join(directory, "index.faiss")
+        self._trained_path = os.path.join(directory, "ivfpq.trained")
+        self._lock_path = os.path.join(directory, ".lock")
+        self._compact_lock_path = os.path.join(directory, ".compact.lock")
+        self._compact_lock = threading.Lock()
+        self._compacting = False
+
+        for path in (self._vec_path, self._dat_path, self._idx_path):
+            open(path, "ab").close()
+
+        with self._file_lock():
+            self._recover()
+        self._records = np.fromfile(self._idx_path, dtype=RECORD_DTYPE)
+        self._owners = {}   # (user key, kind) -> list of doc IDs, ascending
+        self._index_owners(0, len(self._records))
+        self._vec_map = None
+        self._load_indexes()
+
+    # ---------- durability ----------
+    def _file_lock(self):
+        return _FileLock(self._lock_path)
+
+    def _recover(self):
+        """Drop any partially written tail left by a crash mid-append."""
+        self._truncate_tail(np.fromfile(self._idx_path, dtype=RECORD_DTYPE))
+
+    def _truncate_tail(self, records):
+        """Cut all three files back to the committed `records` (file lock held).
+
+        Appends go to the end of each file, so bytes past the last commit
+        (another worker's crash, or an earlier add() here that failed
+        before its idx write) would shift every later row off its ID.
+        """
+        n = len(records)
+        dat_end = int(records[-1]["offset"] + records[-1]["length"]) if n else 0
+        for path, size in ((self._idx_path, n * RECORD_DTYPE.itemsize),
+                           (self._dat_path, dat_end),
+                           (self._vec_path, n * self.row_bytes)):
+            if os.path.getsize(path) > size:
+                os.truncate(path, size)
+
+    def _vectors(self, start, stop):
+        if stop <= start:
+            return np.empty((0, self.dimension), dtype="float32")
+        mm = np.memmap(self._vec_path, dtype="float32", mode="r",
+                       offset=start * self.row_bytes, shape=(stop - start, self.dimension))
+        return np.ascontiguousarray(mm)
+
+    def _vector_map(self, n):
+        """Read-only memmap of the first n rows (n > 0), reused until the store grows."""
+        if self._vec_map is None or len(self._vec_map) < n:
+            self._vec_map = np.memmap(self._vec_path, dtype="float32", mode="r",
+                                      shape=(n, self.dimension))
+        return self._vec_map[:n]
+
+    # ---------- indexes ----------
+    def _index_owners(self, start, stop):
+        """Add records start..stop-1 to the per-(user, kind) ID lists."""
+        if stop <= start:
+            return
+        recs = self._records[start:stop]
+        # group by owner in one vectorized pass; lexsort is stable, so IDs stay ascending
+        order = np.lexsort((recs["kind"], recs["user"]))
+        users, kinds = recs["user"][order], recs["kind"][order]
+        starts = np.flatnonzero(np.r_[True, (users[1:] != users[:-1]) | (kinds[1:] != kinds[:-1])])
+        ids = (order + start).tolist()
+        stops = starts[1:].tolist() + [len(ids)]
+        for a, b, user, kind in zip(starts.tolist(), stops, users[starts].tolist(), kinds[starts].tolist()):
+            self._owners.setdefault((user, kind), []).extend(ids[a:b])
+
+    def _read_snapshot(self):
+        """The on-disk snapshot, mmap-loaded where the index type allows."""
+        if not os.path.exists(self._snap_path):
+            return None
+        for flags in _READ_FLAGS:
+            try:
+                return faiss.read_index(self._snap_path, flags)
+            except RuntimeError:
+                if flags == _READ_FLAGS[-1]:
+                    raise
+
+    def _load_indexes(self, snapshot=None):
+        """Install `snapshot` (default: read from disk) and rebuild the delta after it."""
+        self._snapshot = snapshot if snapshot is not None else self._read_snapshot()
+        self._delta = _new_flat_index(self.dimension)
+        self._add_to_delta(self._snapshot_count(), len(self._records))
+
+    def _snapshot_count(self):
+        return self._snapshot.ntotal if self._snapshot is not None else 0
+
+    def _add_to_delta(self, start, stop):
+        if stop > start:
+            self._delta.add_with_ids(self._vectors(start, stop), np.arange(start, stop, dtype="int64"))
+
+    def _refresh(self):
+        """Pick up rows appended by other worker processes."""
+        n = os.path.getsize(self._idx_path) // RECORD_DTYPE.itemsize
+        if n > len(self._records):
+            old = len(self._records)
+            self._records = np.fromfile(self._idx_path, dtype=RECORD_DTYPE, count=n)
+            self._index_owners(old, n)
+            self._add_to_delta(old, n)
+
+    # ---------- public API ----------
+    def add(self, user_id, texts, vectors, metas=None, kind=KIND_CHUNK):
+        """Append documents for `user_id`; returns their IDs."""
+        vectors = np.asarray(vectors, dtype="float32").reshape(-1, self.dimension)
+        if metas is None:
+            metas = [{}] * len(texts)
+        payloads = [json.dumps({"text": t, "meta": m}).encode("utf-8") for t, m in zip(texts, metas)]
+        key = user_key(user_id)
+
+        with self._lock, self._file_lock():
+            self._refresh()
+            self._truncate_tail(self._records)
+            start = len(self._records)
+            new = np.zeros(len(payloads), dtype=RECORD_DTYPE)
+            with open(self._dat_path, "ab") as dat, open(self._vec_path, "ab") as vec:
+                offset = dat.tell()
+                for i, payload in enumerate(payloads):
+                    dat.write(payload)
+                    new[i] = (offset, len(payload), kind, key)
+                    offset += len(payload)
+                vec.write(vectors.tobytes())
+                for f in (dat, vec):
+                    f.flush()
+                    os.fsync(f.fileno())
+            # the idx record is the commit point
+            with open(self._idx_path, "ab") as idx:
+                idx.write(new.tobytes())
+                idx.flush()
+                os.fsync(idx.fileno())
+
+            self._records = np.concatenate([self._records, new])
+            self._owners.setdefault((key, kind), []).extend(range(start, start + len(payloads)))
+            ids = np.arange(start, start + len(payloads), dtype="int64")
+            self._delta.add_with_ids(vectors, ids)
+            needs_compaction = self._delta.ntotal >= COMPACT_THRESHOLD and not self._compacting
+            if needs_compaction:
+                self._compacting = True
+
+        if needs_compaction:
+            threading.Thread(target=self._compact_in_background, name="vector-compact", daemon=True).start()
+        return ids.tolist()
+
+    def ids_for(self, user_id, kind=KIND_CHUNK):
+        with self._lock:
+            self._refresh()
+            return np.array(self._owners.get((user_key(user_id), kind), ()), dtype="int64")
+
+    def get(self, doc_id):
+        """Payload dict ({"text", "meta"}) of one document."""
+        with self._lock:
+            rec = self._records[doc_id]
+        with open(self._dat_path, "rb") as f:
+            raw = os.pread(f.fileno(), int(rec["length"]), int(rec["offset"]))
+        return json.loads(raw.decode("utf-8"))
+
+    def latest(self, user_id, kind=KIND_REPORT):
+        """(doc_id, payload) of the newest document of `kind`, or None."""
+        ids = self.ids_for(user_id, kind)
+        if len(ids) == 0:
+            return None
+        return int(ids[-1]), self.get(int(ids[-1]))
+
+    def search(self, user_id, query_vectors, k, ids=None):
+        """Nearest chunks of `user_id` only: list of (doc_id, distance).
+
+        `ids` narrows the search further, e.g. to one report's chunks.
+        """
+        query = np.asarray(query_vectors, dtype="float32").reshape(-1, self.dimension)[:1]
+        allowed = self.ids_for(user_id)
+        if ids is not None:
+            allowed = np.intersect1d(allowed, np.asarray(ids, dtype="int64"))
+        ids = allowed
+        if len(ids) == 0:
+            return []
+        k = min(k, len(ids))
+
+        if len(ids) <= EXACT_SEARCH_MAX:
+            with self._lock, metrics.span("vector_exact_search"):
+                return self._exact(query, ids, k)
+
+        selector = faiss.IDSelectorBatch(ids)
+        hits = []
+        with self._lock, metrics.span("faiss_search"):
+            for index in (self._snapshot, self._delta):
+                if index is None or index.ntotal == 0:
+                    continue
+                fetch = k * PQ_RERANK if index_kind(index) == "ivfpq" else k
+                distances, labels = index.search(query, fetch, params=search_params(index, selector, fetch))
+                hits.extend((int(l), float(d)) for l, d in zip(labels[0], distances[0]) if l != -1)
+            if self._snapshot is not None and index_kind(self._snapshot) == "ivfpq":
+                # PQ distances are approximate; re-score candidates from the raw rows
+                return self._exact(query, np.unique([h[0] for h in hits]), k)
+        hits.sort(key=lambda h: h[1])
+        return hits[:k]
+
+    def _exact(self, query, ids, k):
+        """Exact squared-L2 top-k over the given rows of vectors.f32."""
+        ids = np.sort(np.asarray(ids, dtype="int64"))
+        if len(ids) == 0:
+            return []
+        rows = self._vector_map(len(self._records))[ids]
+        distances = ((rows - query[0]) ** 2).sum(axis=1)
+        k = min(k, len(ids))
+        top = np.argpartition(distances, k - 1)[:k]
+        top = top[np.argsort(distances[top])]
+        return [(int(ids[i]), float(distances[i])) for i in top]
+
+    def compact(self):
+        """Fold all committed rows into a new on-disk snapshot and swap it in.
+
+        Runs without the store lock until the swap; committed rows of
+        vectors.f32 never change, so the memmap is safe to read meanwhile.
+        """
+        with self._compact_lock, _FileLock(self._compact_lock_path):
+            with self._lock:
+                self._refresh()
+                n = len(self._records)
+                vectors = self._vector_map(n) if n else None
+            if n == 0:
+                return
+            index = self._extended_snapshot(vectors, n)
+            if index is not None:
+                tmp = self._snap_path + ".tmp"
+                faiss.write_index(index, tmp)
+                with open(tmp, "rb") as f:
+                    os.fsync(f.fileno())
+                os.replace(tmp, self._snap_path)
+                del index
+            snapshot = self._read_snapshot()
+            with self._lock:
+                old = self._snapshot
+                self._refresh()
+                self._load_indexes(snapshot)
+            # freeing the old index can take a while; not under the lock
+            del old
+
+    def _compact_in_background(self):
+        try:
+            self.compact()
+        except Exception as e:
+            print("[vector_store] compaction failed:", e)
+        finally:
+            with self._lock:
+                self._compacting = False
+
+    def _extended_snapshot(self, vectors, n):
+        """Writable index over rows 0..n-1, or None if the disk snapshot has them.
+
+        Starts from the on-disk snapshot (possibly written by another
+        worker) when its type is still the one wanted, adding only the
+        rows it lacks; otherwise builds from scratch.
+        """
+        trained, retrained = self._trained_ivfpq(n)
+        wanted = INDEX_TYPE if n >= ANN_MIN_VECTORS else "flat"
+        base = None
+        if os.path.exists(self._snap_path) and not retrained:
+            base = faiss.read_index(self._snap_path)
+            if index_kind(base) != wanted:
+                base = None
+        if base is None:
+            return build_index(vectors, np.arange(n, dtype="int64"), trained=trained)
+        if base.ntotal >= n:
+            return None
+        _add_batched(base, vectors[base.ntotal:n], np.arange(base.ntotal, n, dtype="int64"))
+        return base
+
+    def _trained_ivfpq(self, n):
+        """(trained empty IVF-PQ index, whether it was just retrained), or (None, False).
+
+        The saved training is reused until the store has doubled.
+        """
+        if INDEX_TYPE != "ivfpq" or n < ANN_MIN_VECTORS or n == 0:
+            return None, False
+        meta_path = self._trained_path + ".json"
+        if os.path.exists(self._trained_path) and os.path.exists(meta_path):
+            with open(meta_path, encoding="utf-8") as f:
+                trained_on = json.load(f)["trained_on"]
+            if n < 2 * trained_on:
+                return faiss.read_index(self._trained_path), False
+        trained = train_ivfpq(self._vector_map(n))
+        faiss.write_index(trained, self._trained_path)
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump({"trained_on": n, "nlist": trained.nlist, "m": PQ_M}, f)
+        return trained, True
+
+    def stats(self):
+        with self._lock:
+            return {
+                "documents": len(self._records),
+                "snapshot": self._snapshot_count(),
+                "delta": self._delta.ntotal,
+                "snapshot_type": index_kind(self._snapshot) if self._snapshot is not None else "none",
+                "compacting": int(self._compacting),
+            }
+
+
+class _FileLock:
+    """Inter-process exclusive lock (no-op where fcntl is unavailable)."""
+
+    def __init__(self, path):
+        self.path = path
+        self._f = None
+
+    def __enter__(self):
+        if fcntl is not None:
+            self._f = open(self.path, "a")
+            fcntl.flock(self._f, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if self._f is not None:
+            fcntl.flock(self._f, fcntl.LOCK_UN)
+            self._f.close()
+            self._f = None
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store(dimension, directory=STORE_DIR):
+    """Process-wide vector store shared by all sessions."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = VectorStore(directory, dimension)
+        return _store